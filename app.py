@@ -158,6 +158,30 @@ def _hex_rgb(h):
     if len(h)==6: return f"{int(h[0:2],16)},{int(h[2:4],16)},{int(h[4:6],16)}"
     return "128,128,128"
 
+def _cache_covers(res, df):
+    """True if a cached result spans df's start and its settled bars equal df's."""
+    if res.index[0] > df.index[0] or res.index[-1] not in df.index: return False
+    cols = ["Open","High","Low","Close","Volume"]
+    # The last cached bar may still have been forming, so it is not compared
+    old = res.loc[df.index[0]:].iloc[:-1]
+    new = df.loc[:res.index[-1]].iloc[:-1]
+    return old.index.equals(new.index) and np.allclose(
+        old[cols].values.astype(float), new[cols].values.astype(float), equal_nan=True)
+
+def compute_indicator(sym, interval, df):
+    """Run the indicator incrementally: only bars newer than the cached result are processed."""
+    key = f"nau_stream_{sym}_{interval}"
+    cached = st.session_state.get(key)
+    if cached is not None and _cache_covers(cached[1], df):
+        indicator, res = cached
+        new_rows = indicator.update(df.loc[res.index[-1]:])
+        res = pd.concat([res.iloc[:-1], new_rows]).loc[df.index[0]:]
+    else:
+        indicator = NAUQuantumAlphaIndicator()
+        res = indicator.update(df)
+    st.session_state[key] = (indicator, res)
+    return res.copy()
+
 # ═══ MAIN ═══
 def run():
     sym = st.session_state.symbol
@@ -168,9 +192,7 @@ def run():
         if df.empty: st.error(f"No data for **{sym}** on **{TF_DISPLAY.get(tf,tf)}**"); return
         if len(df) < 50: st.warning(f"Only {len(df)} candles. Try a longer timeframe."); return
 
-        try:
-            indicator = NAUQuantumAlphaIndicator()
-            df = indicator.compute(df)
+        try: df = compute_indicator(sym, tf, df)
         except Exception as e:
             st.error(f"Indicator error: {e}")
             import traceback; st.code(traceback.format_exc()); return
@@ -21,14 +21,19 @@ Version: 3.0
 
 import sys
 import os
+import bisect
 import json
+import math
 import warnings
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from scipy import signal as scipy_signal
+from scipy import fft as scipy_fft
 from scipy.stats import norm, entropy as scipy_entropy
+from scipy.special import digamma
 from scipy.ndimage import gaussian_filter1d
+from numpy.lib.stride_tricks import sliding_window_view
 from collections import deque
 import colorsys
 
@@ -39,6 +44,62 @@ warnings.filterwarnings('ignore')
 # SECTION 1: ADVANCED MATHEMATICAL ENGINES
 # ═══════════════════════════════════════════════════════════════════════════════
 
+class RollingStats:
+    """
+    Vectorised expanding / rolling moments shared by the factor loops.
+    """
+    @staticmethod
+    def expanding_std(data):
+        """
+        Population std of data[:k+1] for every k (np.std semantics) in O(n).
+        Values are shifted by data[0] before the cumulative sums to limit
+        cancellation on high-priced series.
+        """
+        data = np.asarray(data, dtype=float)
+        if len(data) == 0:
+            return np.zeros(0)
+        shifted = data - data[0]
+        counts = np.arange(1, len(data) + 1)
+        mean = np.cumsum(shifted) / counts
+        var = np.cumsum(shifted * shifted) / counts - mean * mean
+        return np.sqrt(np.maximum(var, 0.0))
+    
+    @staticmethod
+    def rolling_percentiles(data, window, qs, start=1):
+        """
+        out[k, i] == np.percentile(data[max(0, i-window):i], qs[k]) for every
+        i >= start (rows before start are 0). The trailing window is kept as a
+        sorted list with bisect insert/remove, so each bar costs O(log w)
+        searches instead of a sort; interpolation follows np.percentile's
+        'linear' method step for step.
+        """
+        data = np.asarray(data, dtype=float)
+        n = len(data)
+        out = np.zeros((len(qs), n))
+        window_sorted = []
+        for i in range(1, n):
+            bisect.insort(window_sorted, data[i-1])
+            if i - 1 - window >= 0:
+                del window_sorted[bisect.bisect_left(window_sorted, data[i-1-window])]
+            if i >= start:
+                for k, q in enumerate(qs):
+                    out[k, i] = RollingStats._sorted_percentile(window_sorted, q)
+        return out
+    
+    @staticmethod
+    def _sorted_percentile(values, q):
+        """np.percentile(values, q) of an already sorted list (linear method)."""
+        n = len(values)
+        idx = (n - 1) * (q / 100)
+        if idx >= n - 1:
+            return values[-1]
+        lo = int(idx)
+        a, b = values[lo], values[lo + 1]
+        t = idx - lo
+        # np.percentile's _lerp: interpolate from the nearer end
+        return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+
+
 class KalmanFilter:
     """
     Adaptive Kalman Filter for price estimation.
@@ -108,60 +169,243 @@ class AdaptiveKalmanFilter(KalmanFilter):
         if len(self.innovations) > 5:
             innov_var = np.var(list(self.innovations))
             self.Q = self.base_Q + self.adaptation_rate * innov_var
-        
+
         return super().update(measurement)
 
+    def filter_series(self, data, fast=True):
+        """
+        Filter an entire series and return smoothed values.
+
+        fast=True runs the same recursion as update() in a tight loop over
+        preallocated float64 arrays, keeping the innovation variance with
+        O(1) running-moment updates (Welford add/remove) instead of calling
+        np.var on the window every bar. The two paths agree to within a few
+        ulps; fast=False replays update() bar by bar for exact reproduction.
+        """
+        if not fast:
+            return super().filter_series(data)
+
+        values = np.asarray(data, dtype=np.float64).ravel().tolist()
+        n = len(values)
+        filtered = np.empty(n, dtype=np.float64)
+        self.x = None
+        self.P = 1.0
+        self.history = []
+        if n == 0:
+            return filtered
+
+        # Innovation window (ring buffer) and its running mean / M2,
+        # seeded with whatever the previous run left in the window
+        size = self.innovations.maxlen
+        ring = [float(v) for v in self.innovations] + [0.0] * (size - len(self.innovations))
+        count = len(self.innovations)
+        head = 0
+        mean = float(np.mean(ring[:count])) if count else 0.0
+        M2 = float(np.sum((np.array(ring[:count]) - mean) ** 2)) if count else 0.0
+
+        base_Q, rate, R = self.base_Q, self.adaptation_rate, self.R
+        Q, P, K = self.Q, self.P, self.K
+        x = values[0]
+        filtered[0] = x
+        for i in range(1, n):
+            z = values[i]
+            innovation = z - x
+            if count < size:
+                ring[count] = innovation
+                count += 1
+                d = innovation - mean
+                mean += d / count
+                M2 += d * (innovation - mean)
+            else:
+                old = ring[head]
+                ring[head] = innovation
+                head = (head + 1) % size
+                new_mean = mean + (innovation - old) / size
+                M2 += (innovation - old) * (innovation - new_mean + old - mean)
+                mean = new_mean
+            if count > 5:
+                Q = base_Q + rate * max(M2, 0.0) / count
+
+            P_pred = P + Q
+            K = P_pred / (P_pred + R)
+            x = x + K * (z - x)
+            P = (1 - K) * P_pred
+            filtered[i] = x
+
+        self.x, self.P, self.Q, self.K = x, P, Q, K
+        self.innovations = deque(ring[head:count] + ring[:head], maxlen=size)
+        self.history = filtered.tolist()
+        return filtered
+
 
 class WaveletAnalyzer:
     """
     Continuous Wavelet Transform (CWT) for multi-scale price analysis.
     Uses Morlet wavelet to decompose price into different frequency components.
+    
+    The causal mode convolves with only the past half of each kernel, so
+    the coefficient at bar i equals what the centred transform reports for
+    the newest bar of data[:i+1]: no look-ahead, and past values never
+    change when new bars arrive.
     """
     def __init__(self, scales=None):
         self.scales = scales or np.arange(2, 64, 2)
+        self._kernel_cache = {}   # (scales, n, causal) -> (nfft, kernel spectra)
+        self._last_cwt = None     # (key, data, coefficients) of the last transform
+        self._causal_key = None   # scales the causal kernel matrix was built for
+        self._causal_bank = None
+        self._ring = None         # streaming ring buffer (stored twice, newest first)
+        self._ring_pos = 0
         
     def morlet_wavelet(self, t, omega0=6.0):
         """Morlet wavelet function."""
         return np.pi**(-0.25) * np.exp(1j * omega0 * t) * np.exp(-t**2 / 2)
     
-    def cwt(self, data):
-        """Compute Continuous Wavelet Transform."""
+    def _scale_kernel(self, scale, causal=False):
+        """
+        Real Morlet kernel sampled over +/-4 scales, normalised by sqrt(scale).
+        causal=True keeps only the taps applied to the current and past samples.
+        """
+        t = np.arange(-4*scale, 4*scale + 1) / scale
+        wavelet = np.real(self.morlet_wavelet(t))
+        wavelet = wavelet / np.sqrt(scale)
+        return wavelet[(len(wavelet) - 1) // 2:] if causal else wavelet
+    
+    def _kernel_bank(self, n, causal=False):
+        """
+        rFFT of every scale's kernel for a length-n linear convolution.
+        Centred kernels are circularly pre-shifted by their centre offset, so
+        the 'same'-aligned output is simply the first n samples of the irfft
+        (causal half-kernels already start at the current sample).
+        """
+        key = (tuple(np.asarray(self.scales).tolist()), n, causal)
+        bank = self._kernel_cache.get(key)
+        if bank is None:
+            kernels = [self._scale_kernel(scale, causal) for scale in self.scales]
+            nfft = scipy_fft.next_fast_len(n + max(len(k) for k in kernels) - 1, real=True)
+            padded = np.zeros((len(kernels), nfft))
+            for i, k in enumerate(kernels):
+                padded[i, :len(k)] = k
+                if not causal:
+                    padded[i] = np.roll(padded[i], -((len(k) - 1) // 2))
+            if len(self._kernel_cache) >= 8:
+                self._kernel_cache.clear()
+            bank = self._kernel_cache[key] = (nfft, scipy_fft.rfft(padded, axis=-1))
+        return bank
+    
+    def cwt(self, data, method='fft', causal=False):
+        """
+        Compute Continuous Wavelet Transform.
+        
+        method='fft' convolves all scales in one batched rfft/irfft pass
+        against a cached kernel bank; method='direct' runs np.convolve per
+        scale. Both use mode='same' alignment (output[i] is centred on
+        data[i]), or past-only half-kernels when causal=True. The last
+        transform is memoised, so the trend, noise and dominant-cycle
+        helpers share one transform per series.
+        """
+        data = np.asarray(data, dtype=float)
+        key = (tuple(np.asarray(self.scales).tolist()), method, causal)
+        if self._last_cwt is not None and self._last_cwt[0] == key and \
+                np.array_equal(self._last_cwt[1], data):
+            return self._last_cwt[2]
+        
         n = len(data)
-        coefficients = np.zeros((len(self.scales), n))
+        if method == 'direct':
+            coefficients = np.zeros((len(self.scales), n))
+            for i, scale in enumerate(self.scales):
+                if causal:
+                    conv = np.convolve(data, self._scale_kernel(scale, True), mode='full')[:n]
+                else:
+                    conv = np.convolve(data, self._scale_kernel(scale), mode='same')
+                coefficients[i] = conv
+        else:
+            nfft, spectra = self._kernel_bank(n, causal)
+            coefficients = scipy_fft.irfft(
+                scipy_fft.rfft(data, nfft) * spectra, nfft, axis=-1)[:, :n]
         
-        for i, scale in enumerate(self.scales):
-            # Create wavelet at this scale
-            t = np.arange(-4*scale, 4*scale + 1) / scale
-            wavelet = np.real(self.morlet_wavelet(t))
-            wavelet = wavelet / np.sqrt(scale)
-            
-            # Convolve with data
-            conv = np.convolve(data, wavelet, mode='same')
-            coefficients[i] = conv
-            
+        coefficients.flags.writeable = False
+        self._last_cwt = (key, data.copy(), coefficients)
         return coefficients
     
-    def get_dominant_cycle(self, data):
+    def get_dominant_cycle(self, data, causal=False):
         """Find the dominant cycle length in the data."""
-        coefficients = self.cwt(data)
+        coefficients = self.cwt(data, causal=causal)
         power = np.abs(coefficients)**2
         dominant_scale_idx = np.argmax(np.mean(power, axis=1))
         return self.scales[dominant_scale_idx]
     
-    def get_trend_component(self, data, threshold_scale=20):
+    def get_trend_component(self, data, threshold_scale=20, causal=False):
         """Extract trend component (low-frequency)."""
-        coefficients = self.cwt(data)
+        coefficients = self.cwt(data, causal=causal)
         # Use only large-scale (low-frequency) components
         mask = self.scales >= threshold_scale
         trend = np.mean(coefficients[mask], axis=0)
         return trend
     
-    def get_noise_component(self, data, threshold_scale=5):
+    def get_noise_component(self, data, threshold_scale=5, causal=False):
         """Extract noise component (high-frequency)."""
-        coefficients = self.cwt(data)
+        coefficients = self.cwt(data, causal=causal)
         mask = self.scales <= threshold_scale
         noise = np.mean(np.abs(coefficients[mask]), axis=0)
         return noise
+    
+    # ─── Causal streaming mode ───
+    
+    def _causal_matrix(self):
+        """Causal half-kernels as rows, aligned to a newest-first sample window."""
+        key = tuple(np.asarray(self.scales).tolist())
+        if self._causal_key != key:
+            kernels = [self._scale_kernel(scale, causal=True) for scale in self.scales]
+            bank = np.zeros((len(kernels), max(len(k) for k in kernels)))
+            for i, k in enumerate(kernels):
+                bank[i, :len(k)] = k
+            self._causal_key, self._causal_bank = key, bank
+        return self._causal_bank
+    
+    def latest_coefficients(self, data):
+        """Causal coefficients (one per scale) of the newest sample in data."""
+        bank = self._causal_matrix()
+        recent = np.asarray(data, dtype=float)[::-1][:bank.shape[1]]
+        return bank[:, :len(recent)] @ recent
+    
+    def latest_trend(self, data, threshold_scale=20):
+        """Causal trend component of the newest sample in data."""
+        return np.mean(self.latest_coefficients(data)[self.scales >= threshold_scale])
+    
+    def reset_stream(self, history=None):
+        """Clear the ring buffer, optionally priming it with the tail of history."""
+        width = self._causal_matrix().shape[1]
+        self._ring = np.zeros(2 * width)
+        self._ring_pos = 0
+        if history is not None:
+            recent = np.asarray(history, dtype=float)[::-1][:width]
+            self._ring[:len(recent)] = self._ring[width:width + len(recent)] = recent
+    
+    def get_state(self):
+        """Snapshot of the ring buffer, restorable with set_state()."""
+        return {'ring': None if self._ring is None else self._ring.copy(), 'pos': self._ring_pos}
+    
+    def set_state(self, state):
+        self._ring = None if state['ring'] is None else state['ring'].copy()
+        self._ring_pos = state['pos']
+    
+    def update(self, value):
+        """
+        Push one sample into the ring buffer (the last 4*max(scale)+1
+        samples) and return its causal coefficients, one per scale.
+        Costs O(sum of half-kernel lengths) per bar.
+        """
+        if self._ring is None:
+            self.reset_stream()
+        width = len(self._ring) // 2
+        self._ring_pos = (self._ring_pos - 1) % width
+        self._ring[self._ring_pos] = self._ring[self._ring_pos + width] = value
+        return self._causal_matrix() @ self._ring[self._ring_pos:self._ring_pos + width]
+    
+    def update_trend(self, value, threshold_scale=20):
+        """Push one sample and return its causal trend component."""
+        return np.mean(self.update(value)[self.scales >= threshold_scale])
 
 
 class HiddenMarkovModel:
@@ -169,48 +413,74 @@ class HiddenMarkovModel:
     Gaussian Hidden Markov Model for market regime detection.
     States: Bull Market, Bear Market, Sideways/Consolidation
     Uses Baum-Welch for parameter estimation (simplified).
+    Other values of n_states use a generic persistent chain whose states
+    are ordered from the highest-return regime to the lowest.
     """
     def __init__(self, n_states=3, n_iterations=50):
         self.n_states = n_states
-        self.n_iterations = n_iterations
-        # Transition matrix (initialized with slight persistence bias)
-        self.A = np.array([
-            [0.7, 0.15, 0.15],  # Bull -> Bull/Bear/Sideways
-            [0.15, 0.7, 0.15],  # Bear -> Bull/Bear/Sideways
-            [0.2, 0.2, 0.6],    # Sideways -> Bull/Bear/Sideways
-        ])
-        # State means and variances for returns
-        self.means = np.array([0.002, -0.002, 0.0])     # Bull, Bear, Sideways
-        self.stds = np.array([0.01, 0.015, 0.005])      # Volatilities
-        self.pi = np.array([0.33, 0.33, 0.34])          # Initial state probs
+        self.n_iterations = n_iterations    # cap on EM iterations per fit() call
+        self.fitted = False
+        self.n_iter = 0                     # iterations run by the last fit()
+        self.log_likelihood = None          # log P(returns) under the fitted parameters
+        self.alpha = None                   # online filter row (forward_filter / update)
+        self._default_params()
+    
+    def _default_params(self):
+        """Prior parameters: persistent transitions and fixed per-regime moments."""
+        n_states = self.n_states
+        if n_states == 3:
+            # Transition matrix (initialized with slight persistence bias)
+            self.A = np.array([
+                [0.7, 0.15, 0.15],  # Bull -> Bull/Bear/Sideways
+                [0.15, 0.7, 0.15],  # Bear -> Bull/Bear/Sideways
+                [0.2, 0.2, 0.6],    # Sideways -> Bull/Bear/Sideways
+            ])
+            # State means and variances for returns
+            self.means = np.array([0.002, -0.002, 0.0])     # Bull, Bear, Sideways
+            self.stds = np.array([0.01, 0.015, 0.005])      # Volatilities
+            self.pi = np.array([0.33, 0.33, 0.34])          # Initial state probs
+        else:
+            stay = 0.7 if n_states > 1 else 1.0
+            self.A = np.full((n_states, n_states), (1.0 - stay) / max(n_states - 1, 1))
+            np.fill_diagonal(self.A, stay)
+            self.means = np.linspace(0.002, -0.002, n_states)
+            self.stds = np.full(n_states, 0.01)
+            self.pi = np.full(n_states, 1.0 / n_states)
         
     def _emission_prob(self, x, state):
         """Gaussian emission probability."""
         return norm.pdf(x, self.means[state], self.stds[state])
     
+    def _log_emissions(self, observations):
+        """T x N matrix of log emission probabilities in one vectorised call."""
+        obs = np.asarray(observations, dtype=float)[:, None]
+        return np.log(norm.pdf(obs, self.means[None, :], self.stds[None, :]) + 1e-300)
+    
     def viterbi(self, observations):
         """
         Viterbi algorithm to find most likely state sequence.
         Returns: state sequence (0=Bull, 1=Bear, 2=Sideways)
+        
+        Works in log space: the T x N emission matrix and log A are computed
+        once, and each time step is a single (N, N) array operation.
         """
         T = len(observations)
         N = self.n_states
         
+        log_B = self._log_emissions(observations)
+        log_A = np.log(self.A + 1e-300)
+        states_idx = np.arange(N)
+        
         # Initialize
         delta = np.zeros((T, N))
         psi = np.zeros((T, N), dtype=int)
+        delta[0] = np.log(self.pi + 1e-300) + log_B[0]
         
-        for s in range(N):
-            delta[0, s] = np.log(self.pi[s] + 1e-300) + \
-                          np.log(self._emission_prob(observations[0], s) + 1e-300)
-        
-        # Recursion
+        # Recursion: trans[k, s] = delta[t-1, k] + log A[k, s]
         for t in range(1, T):
-            for s in range(N):
-                trans_probs = delta[t-1] + np.log(self.A[:, s] + 1e-300)
-                psi[t, s] = np.argmax(trans_probs)
-                delta[t, s] = trans_probs[psi[t, s]] + \
-                              np.log(self._emission_prob(observations[t], s) + 1e-300)
+            trans = delta[t-1][:, None] + log_A
+            psi[t] = np.argmax(trans, axis=0)
+            delta[t] = trans[psi[t], states_idx] + log_B[t]
         
         # Backtracking
         states = np.zeros(T, dtype=int)
@@ -220,26 +490,219 @@ class HiddenMarkovModel:
         
         return states
     
-    def fit_and_predict(self, returns):
-        """Simplified EM fitting + Viterbi prediction."""
-        if len(returns) < 30:
-            return np.ones(len(returns), dtype=int) * 2  # Default to sideways
-        
-        # Estimate parameters from data
+    def _init_params_from_quantiles(self, returns):
+        """Cold-start emission parameters by splitting sorted returns into regimes."""
+        N = self.n_states
         sorted_returns = np.sort(returns)
         n = len(sorted_returns)
-        # Cluster into 3 regimes by percentile
-        bear_data = sorted_returns[:n//3]
-        sideways_data = sorted_returns[n//3:2*n//3]
-        bull_data = sorted_returns[2*n//3:]
-        
-        self.means = np.array([np.mean(bull_data), np.mean(bear_data), np.mean(sideways_data)])
-        self.stds = np.array([
-            max(np.std(bull_data), 1e-6),
-            max(np.std(bear_data), 1e-6),
-            max(np.std(sideways_data), 1e-6)
-        ])
+        if N == 3:
+            # Cluster into 3 regimes by percentile
+            bear_data = sorted_returns[:n//3]
+            sideways_data = sorted_returns[n//3:2*n//3]
+            bull_data = sorted_returns[2*n//3:]
+            groups = [bull_data, bear_data, sideways_data]
+        else:
+            # Equal-count quantile groups, highest returns first
+            groups = [sorted_returns[k*n//N:(k+1)*n//N] for k in range(N)][::-1]
+        
+        self.means = np.array([np.mean(g) for g in groups])
+        self.stds = np.array([max(np.std(g), 1e-6) for g in groups])
+    
+    @staticmethod
+    def _chain_products(M, reverse=False):
+        """
+        Running products of a (T, N, N) matrix stack, each scaled to unit sum:
+        P[t] = M[0] @ ... @ M[t], or M[t] @ ... @ M[-1] when reverse.
+        Two-level blocked scan: about sqrt(T) batched steps inside blocks,
+        then sqrt(T) steps carrying block totals, so the Python-level loop is
+        O(sqrt(T)) while the work stays O(T N^3).
+        Returns (P, log_scale) with log_scale[t] the log of the dropped factors.
+        """
+        M = M[::-1] if reverse else M
+        T, N, _ = M.shape
+        K = int(np.sqrt(T)) + 1
+        m = -(-T // K)
+        X = np.empty((m * K, N, N))
+        X[:T] = M
+        X[T:] = np.eye(N)
+        X = X.reshape(m, K, N, N)
+        n = X.sum(axis=(2, 3)) + 1e-300
+        X /= n[:, :, None, None]
+        log_scale = np.log(n)
+        
+        # Prefix products inside every block at once
+        for j in range(1, K):
+            Q = X[:, j] @ X[:, j-1] if reverse else X[:, j-1] @ X[:, j]
+            n = Q.sum(axis=(1, 2)) + 1e-300
+            X[:, j] = Q / n[:, None, None]
+            log_scale[:, j] += log_scale[:, j-1] + np.log(n)
+        
+        # Carry: product of all preceding blocks
+        C = np.empty((m, N, N))
+        C[0] = np.eye(N)
+        carry_scale = np.zeros(m)
+        for k in range(1, m):
+            Q = X[k-1, -1] @ C[k-1] if reverse else C[k-1] @ X[k-1, -1]
+            n = Q.sum() + 1e-300
+            C[k] = Q / n
+            carry_scale[k] = carry_scale[k-1] + log_scale[k-1, -1] + np.log(n)
         
+        P = X @ C[:, None] if reverse else C[:, None] @ X
+        n = P.sum(axis=(2, 3)) + 1e-300
+        P = (P / n[:, :, None, None]).reshape(m * K, N, N)[:T]
+        log_scale = (log_scale + carry_scale[:, None] + np.log(n)).ravel()[:T]
+        if reverse:
+            return P[::-1], log_scale[::-1]
+        return P, log_scale
+    
+    def _forward(self, B, alpha0=None):
+        """
+        Scaled forward pass over a T x N emission matrix.
+        Returns (alpha, log_likelihood): alpha[t] = P(state_t | obs[:t+1]).
+        alpha0 continues from a previous filtered row.
+        """
+        alpha = np.empty_like(B)
+        a = self.pi * B[0] if alpha0 is None else np.dot(alpha0, self.A) * B[0]
+        c = a.sum() + 1e-300
+        alpha[0] = a / c
+        ll = np.log(c)
+        if len(B) > 1:
+            # alpha[t] is proportional to alpha[0] @ (A diag B[1]) @ ... @ (A diag B[t])
+            P, log_scale = self._chain_products(self.A[None, :, :] * B[1:, None, :])
+            a = alpha[0] @ P
+            c = a.sum(axis=1) + 1e-300
+            alpha[1:] = a / c[:, None]
+            ll += np.log(c[-1]) + log_scale[-1]
+        return alpha, ll
+    
+    def _forward_backward(self, observations):
+        """
+        Scaled forward-backward pass.
+        Returns (gamma, xi_sum, log_likelihood) where gamma[t] = P(state | data)
+        and xi_sum[k, s] is the expected number of k -> s transitions.
+        """
+        B = np.exp(self._log_emissions(observations))
+        alpha, ll = self._forward(B)
+        beta = np.ones_like(alpha)
+        A = self.A
+        if len(B) > 1:
+            # beta[t] is proportional to (A diag B[t+1]) @ ... @ (A diag B[-1]) @ 1
+            S, _ = self._chain_products(A[None, :, :] * B[1:, None, :], reverse=True)
+            beta[:-1] = S.sum(axis=2)
+        
+        gamma = alpha * beta
+        gamma /= gamma.sum(axis=1, keepdims=True) + 1e-300
+        weighted = B[1:] * beta[1:]
+        norm_t = np.sum((alpha[:-1] @ A) * weighted, axis=1) + 1e-300
+        xi_sum = A * ((alpha[:-1] / norm_t[:, None]).T @ weighted)
+        return gamma, xi_sum, ll
+    
+    def _order_states(self):
+        """Relabel states so 0=Bull (highest mean), 1=Bear (lowest), 2=Sideways."""
+        order = np.argsort(-self.means)
+        if self.n_states == 3:
+            order = order[[0, 2, 1]]
+        self.A = self.A[np.ix_(order, order)]
+        self.pi = self.pi[order]
+        self.means = self.means[order]
+        self.stds = self.stds[order]
+    
+    def fit(self, returns, tol=1e-4, warm_start=False, params=None):
+        """
+        Baum-Welch (EM) fit of A, pi, means and stds.
+        
+        Starts from a quantile split of the returns, so the same data always
+        gives the same fit. Passing params (from get_params) or
+        warm_start=True with an existing fit starts from those parameters
+        instead, e.g. to refresh a cached (symbol, timeframe) fit in a few
+        iterations. Stops once an E-step improves the log-likelihood by less
+        than tol relative to its magnitude, keeping those parameters, or
+        after n_iterations; log_likelihood always belongs to the stored fit.
+        """
+        returns = np.asarray(returns, dtype=float)
+        if params is not None:
+            self.set_params(params)
+        elif not (warm_start and self.fitted):
+            self._default_params()
+            self._init_params_from_quantiles(returns)
+        
+        prev_ll = -np.inf
+        ll = None
+        self.n_iter = 0
+        for _ in range(self.n_iterations):
+            gamma, xi_sum, ll = self._forward_backward(returns)
+            if abs(ll - prev_ll) <= tol * abs(ll):
+                break
+            prev_ll = ll
+            
+            weight = gamma.sum(axis=0) + 1e-300
+            self.pi = gamma[0] / gamma[0].sum()
+            self.A = xi_sum / (xi_sum.sum(axis=1, keepdims=True) + 1e-300)
+            self.means = gamma.T @ returns / weight
+            var = np.sum(gamma * (returns[:, None] - self.means[None, :])**2, axis=0) / weight
+            self.stds = np.maximum(np.sqrt(var), 1e-6)
+            self.n_iter += 1
+            ll = None
+        
+        if ll is None:
+            # Stopped on the iteration cap right after an M-step
+            _, ll = self._forward(np.exp(self._log_emissions(returns)))
+        self._order_states()
+        self.log_likelihood = ll
+        self.fitted = True
+        return self
+    
+    def get_params(self):
+        """Fitted parameters, e.g. to cache per (symbol, timeframe)."""
+        return {
+            'A': self.A.copy(), 'pi': self.pi.copy(),
+            'means': self.means.copy(), 'stds': self.stds.copy(),
+            'log_likelihood': self.log_likelihood,
+            'n_iter': self.n_iter,
+        }
+    
+    def set_params(self, params):
+        """Restore cached parameters; fit(warm_start=True) continues from them."""
+        self.A = np.array(params['A'], dtype=float)
+        self.pi = np.array(params['pi'], dtype=float)
+        self.means = np.array(params['means'], dtype=float)
+        self.stds = np.array(params['stds'], dtype=float)
+        self.n_states = len(self.means)
+        self.log_likelihood = params.get('log_likelihood')
+        self.n_iter = params.get('n_iter', 0)
+        self.fitted = True
+    
+    # ─── Online forward filter ───
+    
+    def forward_filter(self, observations):
+        """
+        Filtered regime probabilities P(state_t | obs[:t+1]) for every t (T x N).
+        Unlike Viterbi, row t never changes when later bars arrive. Leaves the
+        online filter positioned after the last observation.
+        """
+        alpha, _ = self._forward(np.exp(self._log_emissions(observations)))
+        self.alpha = alpha[-1].copy() if len(alpha) else None
+        return alpha
+    
+    def forward_step(self, alpha, x):
+        """One O(N^2) filter step: next normalised alpha from alpha and observation x."""
+        b = np.exp(self._log_emissions([x])[0])
+        a = self.pi * b if alpha is None else np.dot(alpha, self.A) * b
+        return a / (a.sum() + 1e-300)
+    
+    def update(self, x):
+        """Advance the online filter by one observation; returns P(state | data so far)."""
+        self.alpha = self.forward_step(self.alpha, x)
+        return self.alpha.copy()
+    
+    def fit_and_predict(self, returns):
+        """Baum-Welch fit from a cold start + Viterbi prediction."""
+        N = self.n_states
+        if len(returns) < 30:
+            # Default to sideways
+            return np.ones(len(returns), dtype=int) * (2 if N == 3 else N // 2)
+        
+        self.fit(returns)
         return self.viterbi(returns)
 
 
@@ -280,6 +743,39 @@ class BayesianAnalyzer:
         
         return p_long, p_short
     
+    def compute_posterior_matrix(self, factor_matrix):
+        """
+        Batched compute_posterior over many bars.
+        
+        factor_matrix: (n, k) array of factor scores in [-100, 100]; each
+        score f maps to the evidence (0.5 + f/200, 0.5 - f/200).
+        
+        Returns: (p_long, p_short) arrays of length n. Evidence columns are
+        accumulated in the same order as compute_posterior, so each row
+        matches the per-bar result.
+        """
+        factor_matrix = np.atleast_2d(np.asarray(factor_matrix, dtype=float))
+        n, k = factor_matrix.shape
+        log_likelihood_long = np.full(n, np.log(self.prior_long + 1e-300))
+        log_likelihood_short = np.full(n, np.log(self.prior_short + 1e-300))
+        
+        for j in range(k):
+            f = factor_matrix[:, j]
+            log_likelihood_long += np.log(np.maximum(0.5 + f/200, 1e-300))
+            log_likelihood_short += np.log(np.maximum(0.5 - f/200, 1e-300))
+        
+        # Normalize using log-sum-exp trick
+        max_ll = np.maximum(log_likelihood_long, log_likelihood_short)
+        norm_const = max_ll + np.log(
+            np.exp(log_likelihood_long - max_ll) + 
+            np.exp(log_likelihood_short - max_ll)
+        )
+        
+        p_long = np.exp(log_likelihood_long - norm_const)
+        p_short = np.exp(log_likelihood_short - norm_const)
+        
+        return p_long, p_short
+    
     def update_priors(self, win_rate_long, win_rate_short):
         """Update priors based on historical win rates."""
         total = win_rate_long + win_rate_short
@@ -303,6 +799,43 @@ class EntropyAnalyzer:
         hist = hist[hist > 0]
         return scipy_entropy(hist)
     
+    @staticmethod
+    def rolling_shannon_entropy(data, window, bins=20):
+        """
+        Shannon entropy of every length-`window` slice of data in one pass:
+        out[j] == shannon_entropy(data[j:j+window], bins).
+        Each window keeps its own np.histogram bin edges (linspace over its
+        min/max, same index correction), so the scores match the per-window
+        routine to float tolerance.
+        """
+        data = np.asarray(data, dtype=float)
+        if len(data) < window:
+            return np.zeros(0)
+        windows = sliding_window_view(data, window)
+        m = len(windows)
+        
+        lo = windows.min(axis=1)
+        hi = windows.max(axis=1)
+        flat = lo == hi
+        lo = np.where(flat, lo - 0.5, lo)
+        hi = np.where(flat, hi + 0.5, hi)
+        edges = np.linspace(lo, hi, bins + 1, axis=1)
+        
+        # Bin indices as np.histogram computes them for uniform bins
+        idx = ((windows - lo[:, None]) / (hi - lo)[:, None] * bins).astype(np.intp)
+        idx[idx == bins] -= 1
+        rows = np.arange(m)[:, None]
+        idx[windows < edges[rows, idx]] -= 1
+        idx[(windows >= edges[rows, idx + 1]) & (idx != bins - 1)] += 1
+        counts = np.bincount((rows * bins + idx).ravel(),
+                             minlength=m * bins).reshape(m, bins)
+        
+        # density=True histogram, then scipy.stats.entropy of its non-zero bins
+        density = counts / np.diff(edges, axis=1) / window
+        p = density / density.sum(axis=1, keepdims=True)
+        logp = np.log(p, out=np.zeros_like(p), where=p > 0)
+        return -np.sum(p * logp, axis=1)
+    
     @staticmethod
     def approximate_entropy(data, m=2, r_factor=0.2):
         """
@@ -319,15 +852,207 @@ class EntropyAnalyzer:
         if r == 0:
             return 0.0
         
-        def _phi(m_val):
-            patterns = np.array([data[i:i+m_val] for i in range(N - m_val + 1)])
-            counts = np.zeros(len(patterns))
-            for i, pat in enumerate(patterns):
-                dists = np.max(np.abs(patterns - pat), axis=1)
-                counts[i] = np.sum(dists <= r) / len(patterns)
+        # Pairwise |x_a - x_b| once; Chebyshev template distances at level m,
+        # and level m+1 from level m plus the one extra template column
+        x = np.asarray(data, dtype=float)
+        diff = np.abs(x[:, None] - x[None, :])
+        M = N - m + 1
+        dist = diff[:M, :M]
+        for k in range(1, m):
+            dist = np.maximum(dist, diff[k:k+M, k:k+M])
+        dist_next = np.maximum(dist[:-1, :-1], diff[m:, m:])
+        
+        def _phi(d):
+            counts = np.sum(d <= r, axis=1) / len(d)
             return np.mean(np.log(counts + 1e-300))
         
-        return abs(_phi(m) - _phi(m + 1))
+        return abs(_phi(dist) - _phi(dist_next))
+    
+    @staticmethod
+    def rolling_approximate_entropy(data, window, m=2, r_factor=0.2, chunk=2048):
+        """
+        ApEn of every length-`window` slice of data:
+        out[j] == approximate_entropy(data[j:j+window], m, r_factor).
+        Overlapping windows share template distances: the Chebyshev distance
+        between templates starting at a and a+d is computed once per (a, d)
+        and gathered into each window's matrix; only the r-threshold counts
+        are per window. Windows are processed in chunks to bound memory.
+        """
+        x = np.asarray(data, dtype=float)
+        n = len(x)
+        if n < window:
+            return np.zeros(0)
+        n_win = n - window + 1
+        if window < m + 1:
+            return np.zeros(n_win)
+        
+        band, band_next = EntropyAnalyzer._template_bands(x, window, m)
+        r = r_factor * np.std(sliding_window_view(x, window), axis=1)
+        
+        def _phi(b, M, starts, r_c):
+            d = EntropyAnalyzer._window_distances(b, M, starts)
+            counts = np.sum(d <= r_c[:, None, None], axis=2) / M
+            return np.mean(np.log(counts + 1e-300), axis=1)
+        
+        out = np.zeros(n_win)
+        M = window - m + 1
+        for lo in range(0, n_win, chunk):
+            starts = np.arange(lo, min(lo + chunk, n_win))
+            r_c = r[starts]
+            out[starts] = np.abs(_phi(band, M, starts, r_c) -
+                                 _phi(band_next, M - 1, starts, r_c))
+        out[r == 0] = 0.0
+        return out
+    
+    @staticmethod
+    def _template_bands(x, window, m):
+        """
+        Chebyshev distances between templates a and a+d for every lag d inside
+        a window: band[d, a] for length-m templates, band_next[d, a] for m+1.
+        """
+        n = len(x)
+        # lag_diff[d, a] = |x[a] - x[a+d]|
+        lag_diff = np.full((window, n), np.inf)
+        for d in range(window):
+            lag_diff[d, :n-d] = np.abs(x[:n-d] - x[d:])
+        band = lag_diff[:, :n-m+1]
+        for k in range(1, m):
+            band = np.maximum(band, lag_diff[:, k:k+n-m+1])
+        band_next = np.maximum(band[:, :n-m], lag_diff[:, m:])
+        return band, band_next
+    
+    @staticmethod
+    def _window_distances(band, M, starts):
+        """Gather the M×M template distance matrix of each window start from a band."""
+        p = np.arange(M)
+        lag = np.abs(p[:, None] - p[None, :])
+        base = np.minimum(p[:, None], p[None, :])
+        return band[lag, starts[:, None, None] + base]
+    
+    @staticmethod
+    def sample_entropy(data, m=2, r_factor=0.2):
+        """
+        Compute Sample Entropy (SampEn) = -log(A / B).
+        B and A count template pairs (self-matches excluded) within r at
+        lengths m and m+1 over the same N-m templates. Cheaper and less
+        biased than ApEn; when no pair matches, the upper bound
+        log((N-m-1)(N-m)/2) is returned.
+        """
+        N = len(data)
+        if N < m + 2:
+            return 0.0
+        
+        r = r_factor * np.std(data)
+        if r == 0:
+            return 0.0
+        
+        x = np.asarray(data, dtype=float)
+        diff = np.abs(x[:, None] - x[None, :])
+        M = N - m
+        dist = diff[:M, :M]
+        for k in range(1, m):
+            dist = np.maximum(dist, diff[k:k+M, k:k+M])
+        dist_next = np.maximum(dist, diff[m:, m:])
+        
+        B = np.sum(dist <= r) - M
+        A = np.sum(dist_next <= r) - M
+        if A == 0 or B == 0:
+            return np.log((M - 1) * M / 2)
+        return -np.log(A / B)
+    
+    @staticmethod
+    def rolling_sample_entropy(data, window, m=2, r_factor=0.2, chunk=2048):
+        """
+        SampEn of every length-`window` slice of data:
+        out[j] == sample_entropy(data[j:j+window], m, r_factor).
+        Template distances are shared across overlapping windows as in
+        rolling_approximate_entropy.
+        """
+        x = np.asarray(data, dtype=float)
+        n = len(x)
+        if n < window:
+            return np.zeros(0)
+        n_win = n - window + 1
+        if window < m + 2:
+            return np.zeros(n_win)
+        
+        band, band_next = EntropyAnalyzer._template_bands(x, window, m)
+        r = r_factor * np.std(sliding_window_view(x, window), axis=1)
+        
+        M = window - m
+        B = np.zeros(n_win)
+        A = np.zeros(n_win)
+        for lo in range(0, n_win, chunk):
+            starts = np.arange(lo, min(lo + chunk, n_win))
+            r_c = r[starts][:, None, None]
+            B[starts] = np.sum(EntropyAnalyzer._window_distances(band, M, starts) <= r_c, axis=(1, 2)) - M
+            A[starts] = np.sum(EntropyAnalyzer._window_distances(band_next, M, starts) <= r_c, axis=(1, 2)) - M
+        
+        out = np.full(n_win, np.log((M - 1) * M / 2))
+        matched = (A > 0) & (B > 0)
+        out[matched] = -np.log(A[matched] / B[matched])
+        out[r == 0] = 0.0
+        return out
+    
+    @staticmethod
+    def permutation_entropy(data, order=3, delay=1):
+        """
+        Compute normalised Permutation Entropy in [0, 1].
+        Shannon entropy of the ordinal patterns of `order` samples spaced by
+        `delay`, divided by log(order!).
+        Low = regular ordering (trending), High = random ordering.
+        """
+        out = EntropyAnalyzer.rolling_permutation_entropy(data, len(data), order, delay)
+        return float(out[0]) if len(out) else 0.0
+    
+    @staticmethod
+    def rolling_permutation_entropy(data, window, order=3, delay=1):
+        """
+        Permutation entropy of every length-`window` slice of data:
+        out[j] == permutation_entropy(data[j:j+window], order, delay).
+        Each position gets an ordinal-pattern code (Lehmer code of its
+        ranking) once. The window histogram is then slid along the codes:
+        the leaving pattern is removed and the entering one added, updating
+        sum(c * log c) in O(1) per bar, so memory stays O(n) for any order.
+        """
+        x = np.asarray(data, dtype=float)
+        n = len(x)
+        if n < window:
+            return np.zeros(0)
+        n_win = n - window + 1
+        span = (order - 1) * delay
+        if order < 2 or window <= span:
+            return np.zeros(n_win)
+        
+        # Lehmer code: for each element, how many later elements are smaller
+        n_pat = n - span
+        cols = [x[i*delay:i*delay + n_pat] for i in range(order)]
+        codes = np.zeros(n_pat, dtype=np.intp)
+        for i in range(order - 1):
+            smaller = sum((cols[j] < cols[i]).astype(np.intp) for j in range(i + 1, order))
+            codes = codes * (order - i) + smaller
+        
+        n_codes = math.factorial(order)
+        per_window = window - span
+        # With counts c over W patterns: H = log W - sum(c * log c) / W
+        clogc = (np.arange(per_window + 1) *
+                 np.log(np.maximum(np.arange(per_window + 1), 1))).tolist()
+        counts = np.bincount(codes[:per_window], minlength=n_codes).tolist()
+        s = sum(clogc[c] for c in counts)
+        sum_clogc = np.empty(n_win)
+        sum_clogc[0] = s
+        code_l = codes.tolist()
+        for j in range(1, n_win):
+            a = code_l[j - 1]
+            c = counts[a]
+            s += clogc[c - 1] - clogc[c]
+            counts[a] = c - 1
+            b = code_l[j + per_window - 1]
+            c = counts[b]
+            s += clogc[c + 1] - clogc[c]
+            counts[b] = c + 1
+            sum_clogc[j] = s
+        return (np.log(per_window) - sum_clogc / per_window) / np.log(n_codes)
     
     @staticmethod
     def hurst_exponent(data, max_lag=20):
@@ -369,6 +1094,149 @@ class EntropyAnalyzer:
         # Linear regression in log-log space
         coeffs = np.polyfit(rs_array[:, 0], rs_array[:, 1], 1)
         return np.clip(coeffs[0], 0.0, 1.0)
+    
+    @staticmethod
+    def rolling_hurst_exponent(data, window, max_lag=20):
+        """
+        R/S Hurst exponent of every length-`window` slice of data:
+        out[j] == hurst_exponent(data[j:j+window], max_lag) to float tolerance.
+        For each lag the rescaled range of every sub-series start position is
+        computed once over a strided view and gathered per window; the
+        log-log slope is solved in closed form for all windows at once.
+        """
+        x = np.asarray(data, dtype=float)
+        n = len(x)
+        if n < window:
+            return np.zeros(0)
+        n_win = n - window + 1
+        if window < max_lag * 2:
+            return np.full(n_win, 0.5)
+        
+        starts = np.arange(n_win)[:, None]
+        # Regression sums over the lags each window has a valid R/S for
+        sums = np.zeros((5, n_win))
+        for lag in range(2, min(max_lag, window // 2)):
+            sub = sliding_window_view(x, lag)
+            cumulative = np.cumsum(sub - sub.mean(axis=1, keepdims=True), axis=1)
+            R = cumulative.max(axis=1) - cumulative.min(axis=1)
+            S = sub.std(axis=1)
+            valid = S > 0
+            rs = np.divide(R, S, out=np.zeros_like(R), where=valid)
+            
+            idx = starts + lag * np.arange(window // lag)
+            n_valid = valid[idx].sum(axis=1)
+            has = n_valid > 0
+            EntropyAnalyzer._add_loglog_point(
+                sums, has, np.log(lag), np.log(rs[idx].sum(axis=1)[has] / n_valid[has]))
+        
+        slope = EntropyAnalyzer._loglog_slope(sums)
+        return np.where(np.isnan(slope), 0.5, np.clip(slope, 0.0, 1.0))
+    
+    @staticmethod
+    def _add_loglog_point(sums, has, log_x, log_y):
+        """Accumulate one (log_x, log_y) point into the regression sums of windows `has`."""
+        sums[0, has] += 1
+        sums[1, has] += log_x
+        sums[2, has] += log_x * log_x
+        sums[3, has] += log_y
+        sums[4, has] += log_x * log_y
+    
+    @staticmethod
+    def _loglog_slope(sums):
+        """Closed-form least-squares slope per window; NaN with fewer than two points."""
+        k, sx, sxx, sy, sxy = sums
+        slope = np.full(sums.shape[1], np.nan)
+        fit = k >= 2
+        slope[fit] = ((k[fit] * sxy[fit] - sx[fit] * sy[fit]) /
+                      (k[fit] * sxx[fit] - sx[fit] ** 2))
+        return slope
+    
+    @staticmethod
+    def dfa_hurst(data, max_lag=20):
+        """
+        Hurst exponent by first-order Detrended Fluctuation Analysis.
+        The series is taken as the profile (price level), so a random walk
+        gives H = 0.5. F(s) is the RMS residual of a linear fit over
+        non-overlapping segments of length s; H is the slope of log F vs log s.
+        """
+        out = EntropyAnalyzer.rolling_dfa_hurst(data, len(data), max_lag)
+        return float(out[0]) if len(out) else 0.5
+    
+    @staticmethod
+    def rolling_dfa_hurst(data, window, max_lag=20):
+        """
+        DFA Hurst exponent of every length-`window` slice of data.
+        Every length-s segment is fitted on its own centred values and local
+        time, with the residuals formed explicitly, so the fluctuation does
+        not depend on the series' offset or drift (global prefix sums of y
+        and t·y lose it to cancellation on long trending series). A window
+        costs O(lags · window) and all windows share each segment's fit.
+        """
+        x = np.asarray(data, dtype=float)
+        n = len(x)
+        if n < window:
+            return np.zeros(0)
+        n_win = n - window + 1
+        
+        starts = np.arange(n_win)[:, None]
+        sums = np.zeros((5, n_win))
+        for seg in range(4, min(max_lag, window // 2) + 1):
+            # Residual sum of squares of the linear fit on [p, p+seg) for every p
+            t = np.arange(seg) - (seg - 1) / 2.0
+            s_tt = seg * (seg * seg - 1) / 12.0
+            y = sliding_window_view(x, seg)
+            y = y - y.mean(axis=1, keepdims=True)
+            resid = y - np.outer(y @ t / s_tt, t)
+            rss = np.einsum('ij,ij->i', resid, resid)
+            
+            f2 = rss[starts + seg * np.arange(window // seg)].mean(axis=1) / seg
+            has = f2 > 0
+            EntropyAnalyzer._add_loglog_point(sums, has, np.log(seg), 0.5 * np.log(f2[has]))
+        
+        slope = EntropyAnalyzer._loglog_slope(sums)
+        return np.where(np.isnan(slope), 0.5, np.clip(slope, 0.0, 1.0))
+    
+    @staticmethod
+    def aggvar_hurst(data, max_lag=20):
+        """
+        Hurst exponent by the aggregated-variance method.
+        Increments of the series are averaged over non-overlapping blocks of
+        size m; Var(block mean) ~ m^(2H-2), so H = 1 + slope / 2.
+        """
+        out = EntropyAnalyzer.rolling_aggvar_hurst(data, len(data), max_lag)
+        return float(out[0]) if len(out) else 0.5
+    
+    @staticmethod
+    def rolling_aggvar_hurst(data, window, max_lag=20):
+        """
+        Aggregated-variance Hurst exponent of every length-`window` slice.
+        The series itself is the prefix sum of its increments, so each block
+        mean is (x[a+m] - x[a]) / m and needs no per-block summation.
+        
+        Block variances use ddof=1 over at least eight blocks, and each log
+        variance is corrected by E[log(chi2_nu / nu)] = digamma(nu/2) - log(nu/2)
+        (nu = blocks - 1); without it the few-block lags pull H down, to a
+        mean of ~0.36 on a random walk at window 40 instead of 0.5.
+        """
+        x = np.asarray(data, dtype=float)
+        n = len(x)
+        if n < window:
+            return np.zeros(0)
+        n_win = n - window + 1
+        
+        starts = np.arange(n_win)[:, None]
+        sums = np.zeros((5, n_win))
+        for m in range(1, min(max_lag, (window - 1) // 8) + 1):
+            blocks = (window - 1) // m
+            edges = x[starts + m * np.arange(blocks + 1)]
+            var = (np.diff(edges, axis=1) / m).var(axis=1, ddof=1)
+            has = var > 0
+            nu = blocks - 1
+            log_bias = digamma(nu / 2.0) - np.log(nu / 2.0)
+            EntropyAnalyzer._add_loglog_point(sums, has, np.log(m), np.log(var[has]) - log_bias)
+        
+        slope = EntropyAnalyzer._loglog_slope(sums)
+        return np.where(np.isnan(slope), 0.5, np.clip(1.0 + slope / 2.0, 0.0, 1.0))
 
 
 class FractalAnalyzer:
@@ -382,32 +1250,48 @@ class FractalAnalyzer:
         A fractal high: highest high with 2 lower highs on each side.
         A fractal low: lowest low with 2 higher lows on each side.
         """
+        highs = np.asarray(highs, dtype=float)
+        lows = np.asarray(lows, dtype=float)
         n = len(highs)
         half = period // 2
         fractal_highs = np.full(n, np.nan)
         fractal_lows = np.full(n, np.nan)
+        if n < 2 * half + 1:
+            return fractal_highs, fractal_lows
         
-        for i in range(half, n - half):
-            # Check fractal high
-            is_high = True
-            for j in range(1, half + 1):
-                if highs[i] <= highs[i-j] or highs[i] <= highs[i+j]:
-                    is_high = False
-                    break
-            if is_high:
-                fractal_highs[i] = highs[i]
-            
-            # Check fractal low
-            is_low = True
-            for j in range(1, half + 1):
-                if lows[i] >= lows[i-j] or lows[i] >= lows[i+j]:
-                    is_low = False
-                    break
-            if is_low:
-                fractal_lows[i] = lows[i]
+        # Row i holds bars i..i+2*half; column `half` is the candidate centre.
+        # Masks negate the non-strict rejection tests, so NaN neighbours never reject.
+        neighbours = np.delete(np.arange(2 * half + 1), half)
+        win_h = sliding_window_view(highs, 2 * half + 1)
+        win_l = sliding_window_view(lows, 2 * half + 1)
+        is_high = ~np.any(win_h[:, half:half+1] <= win_h[:, neighbours], axis=1)
+        is_low = ~np.any(win_l[:, half:half+1] >= win_l[:, neighbours], axis=1)
         
+        centre = np.arange(half, n - half)
+        fractal_highs[centre[is_high]] = highs[centre[is_high]]
+        fractal_lows[centre[is_low]] = lows[centre[is_low]]
         return fractal_highs, fractal_lows
     
+    @staticmethod
+    def williams_fractal_last(highs, lows, period=5):
+        """
+        Incremental Williams check for streaming: when bar n-1 arrives only
+        bar n-1-half becomes decidable, so just that candle is confirmed.
+        Returns (fractal_high, fractal_low) of bar n-1-half, NaN where not a
+        fractal; matches williams_fractals(highs, lows, period)[k][n-1-half].
+        """
+        half = period // 2
+        n = len(highs)
+        if n < 2 * half + 1:
+            return np.nan, np.nan
+        win_h = np.asarray(highs[n-2*half-1:], dtype=float)
+        win_l = np.asarray(lows[n-2*half-1:], dtype=float)
+        neighbours = np.delete(np.arange(2 * half + 1), half)
+        is_high = not np.any(win_h[half] <= win_h[neighbours])
+        is_low = not np.any(win_l[half] >= win_l[neighbours])
+        return (win_h[half] if is_high else np.nan,
+                win_l[half] if is_low else np.nan)
+    
     @staticmethod
     def fractal_dimension(data, max_k=10):
         """
@@ -419,17 +1303,17 @@ class FractalAnalyzer:
         N = len(data)
         if N < max_k * 4:
             return 1.5
-            
+        
+        data = np.asarray(data, dtype=float)
         lk = []
         for k in range(1, max_k + 1):
             lengths = []
             for m in range(1, k + 1):
-                # Compute length for this k and starting point m
+                # Curve length over data[m], data[m+k], ... (n_points samples)
                 n_points = (N - m) // k
                 if n_points < 2:
                     continue
-                length = sum(abs(data[m + i*k] - data[m + (i-1)*k]) 
-                           for i in range(1, n_points) if m + i*k < N)
+                length = np.sum(np.abs(np.diff(data[m::k][:n_points])))
                 if length > 0:
                     length = (length * (N - 1)) / (max(n_points - 1, 1) * k * k)
                     lengths.append(length)
@@ -444,6 +1328,51 @@ class FractalAnalyzer:
         y = np.log(np.array(lk) + 1e-300)
         coeffs = np.polyfit(x, y, 1)
         return np.clip(abs(coeffs[0]), 1.0, 2.0)
+    
+    @staticmethod
+    def rolling_fractal_dimension(data, window, max_k=10):
+        """
+        Higuchi fractal dimension of every length-`window` slice of data:
+        out[j] == fractal_dimension(data[j:j+window], max_k) to float tolerance.
+        Curve lengths for every (k, m) are taken over all windows at once on
+        a strided view, and the log-log slopes of all windows come from one
+        batched least-squares solve against the shared design matrix.
+        Windows with a degenerate (zero-length) k fall back to the scalar path.
+        """
+        x = np.asarray(data, dtype=float)
+        n = len(x)
+        if n < window:
+            return np.zeros(0)
+        n_win = n - window + 1
+        if window < max_k * 4:
+            return np.full(n_win, 1.5)
+        
+        windows = sliding_window_view(x, window)
+        lk = np.zeros((n_win, max_k))
+        complete = np.ones(n_win, dtype=bool)
+        for k in range(1, max_k + 1):
+            total = np.zeros(n_win)
+            count = np.zeros(n_win)
+            for m in range(1, k + 1):
+                n_points = (window - m) // k
+                if n_points < 2:
+                    continue
+                pts = windows[:, m:m + (n_points - 1) * k + 1:k]
+                length = np.abs(np.diff(pts, axis=1)).sum(axis=1)
+                pos = length > 0
+                total += np.where(pos, length * (window - 1) / (max(n_points - 1, 1) * k * k), 0.0)
+                count += pos
+            complete &= count > 0
+            lk[:, k-1] = total / np.maximum(count, 1)
+        
+        # Least squares of log L(k) on [log k, 1] for all complete windows at once
+        design = np.column_stack([np.log(np.arange(1, max_k + 1)), np.ones(max_k)])
+        coeffs = np.linalg.lstsq(design, np.log(lk[complete] + 1e-300).T, rcond=None)[0]
+        out = np.empty(n_win)
+        out[complete] = np.clip(np.abs(coeffs[0]), 1.0, 2.0)
+        for j in np.flatnonzero(~complete):
+            out[j] = FractalAnalyzer.fractal_dimension(windows[j], max_k)
+        return out
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -468,23 +1397,28 @@ class SmartMoneyConcepts:
         bearish_ob = np.full(n, np.nan)
         
         avg_range = np.mean(highs[:min(50, n)] - lows[:min(50, n)])
+        if n < 3:
+            return bullish_ob, bearish_ob
         
-        for i in range(2, n):
-            # Strong move detection (1.5x average range)
-            move = closes[i] - closes[i-2]
-            
-            if move > avg_range * 1.5:  # Strong bullish move
-                # Find last bearish candle before move
-                for j in range(i-1, max(i-lookback, 0), -1):
-                    if closes[j] < opens[j]:  # Bearish candle
-                        bullish_ob[j] = lows[j]
-                        break
-                        
-            elif move < -avg_range * 1.5:  # Strong bearish move
-                for j in range(i-1, max(i-lookback, 0), -1):
-                    if closes[j] > opens[j]:  # Bullish candle
-                        bearish_ob[j] = highs[j]
-                        break
+        # Strong move detection (1.5x average range) at bars i = 2..n-1
+        move = closes[2:] - closes[:-2]
+        bull_move = move > avg_range * 1.5
+        bear_move = ~bull_move & (move < -avg_range * 1.5)
+        
+        # Index of the last bearish / bullish candle at or before each bar
+        idx = np.arange(n)
+        last_bear = np.maximum.accumulate(np.where(closes < opens, idx, -1))
+        last_bull = np.maximum.accumulate(np.where(closes > opens, idx, -1))
+        
+        # Opposite candle searched in (max(i-lookback, 0), i-1]
+        i = idx[2:]
+        floor = np.maximum(i - lookback, 0)
+        j = last_bear[i-1][bull_move]
+        j = j[j > floor[bull_move]]
+        bullish_ob[j] = lows[j]
+        j = last_bull[i-1][bear_move]
+        j = j[j > floor[bear_move]]
+        bearish_ob[j] = highs[j]
         
         return bullish_ob, bearish_ob
     
@@ -500,21 +1434,83 @@ class SmartMoneyConcepts:
         bullish_fvg_bottom = np.full(n, np.nan)
         bearish_fvg_top = np.full(n, np.nan)
         bearish_fvg_bottom = np.full(n, np.nan)
+        if n < 3:
+            return (bullish_fvg_top, bullish_fvg_bottom,
+                    bearish_fvg_top, bearish_fvg_bottom)
         
-        for i in range(2, n):
-            # Bullish FVG: candle[i]'s low > candle[i-2]'s high
-            if lows[i] > highs[i-2]:
-                bullish_fvg_top[i-1] = lows[i]
-                bullish_fvg_bottom[i-1] = highs[i-2]
-            
-            # Bearish FVG: candle[i]'s high < candle[i-2]'s low
-            if highs[i] < lows[i-2]:
-                bearish_fvg_top[i-1] = lows[i-2]
-                bearish_fvg_bottom[i-1] = highs[i]
+        # Bullish FVG: candle[i]'s low > candle[i-2]'s high, marked on candle i-1
+        bull = np.flatnonzero(lows[2:] > highs[:-2]) + 2
+        bullish_fvg_top[bull - 1] = lows[bull]
+        bullish_fvg_bottom[bull - 1] = highs[bull - 2]
+        
+        # Bearish FVG: candle[i]'s high < candle[i-2]'s low
+        bear = np.flatnonzero(highs[2:] < lows[:-2]) + 2
+        bearish_fvg_top[bear - 1] = lows[bear - 2]
+        bearish_fvg_bottom[bear - 1] = highs[bear]
         
         return (bullish_fvg_top, bullish_fvg_bottom, 
                 bearish_fvg_top, bearish_fvg_bottom)
     
+    FVG_DTYPE = np.dtype([('index', np.int64), ('top', np.float64), ('bottom', np.float64),
+                          ('direction', np.int8), ('filled_at', np.int64)])
+    
+    @staticmethod
+    def fvg_table(highs, lows, closes, fvg=None):
+        """
+        Fair Value Gaps as one structured array (FVG_DTYPE), sorted by index:
+        index (middle candle, as in detect_fair_value_gaps), top, bottom,
+        direction (+1 bullish, -1 bearish) and filled_at, the first later bar
+        that trades through the far edge (low <= bottom for bullish, high >= top
+        for bearish), or -1 while unfilled.
+        fvg: the four arrays of detect_fair_value_gaps, if already computed.
+        """
+        highs = np.asarray(highs, dtype=float)
+        lows = np.asarray(lows, dtype=float)
+        if fvg is None:
+            fvg = SmartMoneyConcepts.detect_fair_value_gaps(highs, lows, closes)
+        bt, bb, st, sb = fvg
+        bull = np.flatnonzero(~np.isnan(bt))
+        bear = np.flatnonzero(~np.isnan(st))
+        
+        table = np.zeros(len(bull) + len(bear), dtype=SmartMoneyConcepts.FVG_DTYPE)
+        table['index'] = np.concatenate([bull, bear])
+        table['top'] = np.concatenate([bt[bull], st[bear]])
+        table['bottom'] = np.concatenate([bb[bull], sb[bear]])
+        table['direction'] = np.concatenate([np.ones(len(bull)), -np.ones(len(bear))])
+        # Filling is searched from the bar after the gap-forming candle (index + 1)
+        table['filled_at'] = np.concatenate([
+            SmartMoneyConcepts._first_crossing(lows, bull + 2, bb[bull], below=True),
+            SmartMoneyConcepts._first_crossing(highs, bear + 2, st[bear], below=False)])
+        return np.sort(table, order=['index', 'direction'])
+    
+    @staticmethod
+    def _first_crossing(values, starts, levels, below=True):
+        """
+        First k >= starts[q] with values[k] <= levels[q] (below) or >= (above),
+        -1 if none. Binary lifting over a sparse table of range minima, so all
+        queries resolve in O((n + q) log n).
+        """
+        n = len(values)
+        starts = np.asarray(starts, dtype=np.int64)
+        if n == 0 or len(starts) == 0:
+            return np.full(len(starts), -1, dtype=np.int64)
+        # Work with minima: negate for the "above" search
+        v = values if below else -values
+        lv = levels if below else -levels
+        
+        # table[p][k] = min(v[k:k + 2**p]); +inf past the end
+        table = [np.concatenate([v, [np.inf]])]
+        while (1 << len(table)) <= n:
+            prev, step = table[-1], 1 << (len(table) - 1)
+            table.append(np.minimum(prev, np.concatenate([prev[step:], np.full(step, np.inf)])))
+        
+        # Skip blocks whose minimum stays above the level
+        pos = np.minimum(starts, n)
+        for p in range(len(table) - 1, -1, -1):
+            skip = table[p][np.minimum(pos, n)] > lv
+            pos = np.where(skip, pos + (1 << p), pos)
+        return np.where(pos < n, pos, -1)
+    
     @staticmethod
     def detect_bos_choch(highs, lows, closes, swing_period=5):
         """
@@ -526,49 +1522,111 @@ class SmartMoneyConcepts:
         bos_signals = np.zeros(n)   # +1 bullish, -1 bearish
         choch_signals = np.zeros(n) # +1 bullish, -1 bearish
         
-        # Find swing highs and lows
-        swing_highs = []
-        swing_lows = []
-        
-        for i in range(swing_period, n - swing_period):
-            if highs[i] == max(highs[i-swing_period:i+swing_period+1]):
-                swing_highs.append((i, highs[i]))
-            if lows[i] == min(lows[i-swing_period:i+swing_period+1]):
-                swing_lows.append((i, lows[i]))
-        
-        # Track current trend direction
-        trend = 0  # 0=undefined, 1=bullish, -1=bearish
+        # Find swing highs and lows: bars equal to the max/min of their
+        # ±swing_period neighbourhood (rolling max/min over a strided view)
+        width = 2 * swing_period + 1
+        swing_highs = swing_lows = np.zeros(0, dtype=np.intp)
+        if n >= width:
+            centre = np.arange(swing_period, n - swing_period)
+            inner = slice(swing_period, n - swing_period)
+            swing_highs = centre[highs[inner] == sliding_window_view(highs, width).max(axis=1)]
+            swing_lows = centre[lows[inner] == sliding_window_view(lows, width).min(axis=1)]
         
+        # Sweep the bars keeping the levels of swings with idx < i-1 sorted.
+        # Bar i breaks a swing high if some level sits in [closes[i-1], closes[i]),
+        # a swing low if some level sits in (closes[i], closes[i-1]]; the two
+        # cannot happen on the same bar.
+        breaks = np.zeros(n, dtype=np.int8)
+        active_highs, active_lows = [], []
+        next_high = next_low = 0
         for i in range(1, n):
-            # Check for break of swing highs
-            for idx, level in swing_highs:
-                if idx < i - 1 and closes[i] > level and closes[i-1] <= level:
-                    if trend == -1:  # Was bearish, now breaking high
-                        choch_signals[i] = 1
-                        trend = 1
-                    elif trend == 1:
-                        bos_signals[i] = 1
-                    else:
-                        trend = 1
-                        bos_signals[i] = 1
-                    break
+            while next_high < len(swing_highs) and swing_highs[next_high] < i - 1:
+                bisect.insort(active_highs, highs[swing_highs[next_high]])
+                next_high += 1
+            while next_low < len(swing_lows) and swing_lows[next_low] < i - 1:
+                bisect.insort(active_lows, lows[swing_lows[next_low]])
+                next_low += 1
             
-            # Check for break of swing lows
-            for idx, level in swing_lows:
-                if idx < i - 1 and closes[i] < level and closes[i-1] >= level:
-                    if trend == 1:  # Was bullish, now breaking low
-                        choch_signals[i] = -1
-                        trend = -1
-                    elif trend == -1:
-                        bos_signals[i] = -1
-                    else:
-                        trend = -1
-                        bos_signals[i] = -1
-                    break
+            prev_close, close = closes[i-1], closes[i]
+            k = bisect.bisect_left(active_highs, prev_close)
+            if k < len(active_highs) and active_highs[k] < close:
+                breaks[i] = 1
+                continue
+            k = bisect.bisect_right(active_lows, prev_close)
+            if k > 0 and active_lows[k-1] > close:
+                breaks[i] = -1
+        
+        # Trend is the direction of the previous break (0=undefined at start):
+        # a break against it is a CHoCH, otherwise a BOS
+        at = np.flatnonzero(breaks)
+        direction = breaks[at].astype(float)
+        trend = np.concatenate([[0.0], direction[:-1]])
+        reversal = trend == -direction
+        choch_signals[at[reversal]] = direction[reversal]
+        bos_signals[at[~reversal]] = direction[~reversal]
         
         return bos_signals, choch_signals
 
 
+class FVGIndex:
+    """
+    Interval index over a Fair Value Gap table (SmartMoneyConcepts.fvg_table).
+    A gap is live on bars [index + 1, filled_at): known once its third candle
+    closes, gone on the bar that fills it. Answers "unfilled gaps at bar i"
+    with binary searches and a segment tree instead of rescanning history.
+    """
+    FANOUT = 32   # children per segment-tree node
+    
+    def __init__(self, table):
+        self.table = np.sort(np.asarray(table, dtype=SmartMoneyConcepts.FVG_DTYPE), order='index')
+        self.start = self.table['index'] + 1
+        filled = self.table['filled_at']
+        self.end = np.where(filled >= 0, filled, np.iinfo(np.int64).max)
+        self._sorted_end = np.sort(self.end)
+        
+        # FANOUT-ary segment tree of the latest end over the start-ordered
+        # gaps: _max_end[0] are the leaves, node k of level l covers leaves
+        # [k * FANOUT**l, (k + 1) * FANOUT**l); levels are padded with dead nodes
+        level = self.end
+        self._max_end = []
+        while True:
+            if len(level) > 1 and len(level) % self.FANOUT:
+                level = np.append(level, np.full(self.FANOUT - len(level) % self.FANOUT,
+                                                 np.iinfo(np.int64).min))
+            self._max_end.append(level)
+            if len(level) <= 1:
+                break
+            level = level.reshape(-1, self.FANOUT).max(axis=1)
+    
+    def __len__(self):
+        return len(self.table)
+    
+    def active_at(self, i):
+        """
+        Structured rows of the gaps still unfilled at bar i, in index order.
+        Descends the tree one level at a time, keeping only nodes that start
+        by bar i and end after it, so it touches O((1 + k) log n) nodes for
+        k live gaps.
+        """
+        started = np.searchsorted(self.start, i, side='right')
+        if started == 0:
+            return self.table[:0]
+        children = np.arange(self.FANOUT)
+        nodes = np.zeros(1, dtype=np.intp)
+        for depth in range(len(self._max_end) - 1, -1, -1):
+            nodes = nodes[(nodes * self.FANOUT ** depth < started) &
+                          (self._max_end[depth][nodes] > i)]
+            if depth:
+                nodes = (nodes[:, None] * self.FANOUT + children).ravel()
+        return self.table[nodes]
+    
+    def active_counts(self, bars):
+        """Number of live gaps at each bar in `bars` (vectorised)."""
+        bars = np.asarray(bars)
+        return (np.searchsorted(self.start, bars, side='right') -
+                np.searchsorted(self._sorted_end, bars, side='right'))
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
@@ -580,6 +1638,7 @@ class TemporalAttention:
     """Transformer-inspired self-attention for pattern recognition."""
     def __init__(self, window=30, n_heads=4):
         self.window = window; self.n_heads = n_heads
+        self.reset()
     def compute_score(self, closes, volumes, idx):
         if idx < self.window: return 0.0
         start = max(0, idx - self.window)
@@ -604,27 +1663,176 @@ class TemporalAttention:
             scores.append(np.sum(w*feats[:,0]))
         return np.clip(np.mean(scores)*5000, -100, 100)
 
+    def compute_scores(self, closes, volumes, chunk=4096):
+        """Batched compute_score for every bar: out[i] == compute_score(closes, volumes, i)."""
+        closes = np.asarray(closes, dtype=float); volumes = np.asarray(volumes, dtype=float)
+        n = len(closes); L = self.window + 1
+        out = np.zeros(n)
+        if n < L or L < 5: return out
+        starts = np.arange(n - L + 1); bar_feats = self._bar_features(closes)
+        for lo in range(0, len(starts), chunk):
+            st = starts[lo:lo+chunk]
+            out[st + self.window] = self._scores(self._window_features(closes, volumes, st, bar_feats))
+        return out
+
+    @staticmethod
+    def _bar_features(closes):
+        """Position-invariant per-bar features: 1/3-bar returns, 6-bar CV, 11-bar high/low."""
+        eps = 1e-10
+        n = len(closes); ret1 = np.zeros(n); ret3 = np.zeros(n); vol6 = np.zeros(n)
+        hi11 = closes.copy(); lo11 = closes.copy()
+        ret1[1:] = (closes[1:]-closes[:-1])/(closes[:-1]+eps)
+        ret3[3:] = (closes[3:]-closes[:-3])/(closes[:-3]+eps)
+        if n >= 6:
+            w6 = sliding_window_view(closes, 6); vol6[5:] = np.std(w6, axis=1)/(np.mean(w6, axis=1)+eps)
+        if n >= 11:
+            w11 = sliding_window_view(closes, 11); hi11[10:] = w11.max(axis=1); lo11[10:] = w11.min(axis=1)
+        return ret1, ret3, vol6, hi11, lo11
+
+    def _window_features(self, closes, volumes, starts, bar_feats):
+        """Feature tensor (len(starts), window+1, 6) of the windows closes[s:s+window+1]."""
+        L = self.window + 1; eps = 1e-10
+        ret1, ret3, vol6, hi11, lo11 = bar_feats
+        view = lambda a: sliding_window_view(a, L)[starts]
+        seg_c = view(closes); seg_v = view(volumes)
+        feats = np.zeros((len(starts), L, 6))
+        feats[:,1:,0] = view(ret1)[:,1:]
+        # Volume vs the expanding mean from the window start
+        for i in range(L):
+            feats[:,i,1] = seg_v[:,i]/(np.mean(seg_v[:,:max(1,i)], axis=1)+eps)
+        feats[:,3:,2] = view(ret3)[:,3:]
+        # Early positions use slices clipped at the window start
+        feats[:,5:,3] = view(vol6)[:,5:]
+        for i in range(1, min(5, L)):
+            feats[:,i,3] = np.std(seg_c[:,:i+1], axis=1)/(np.mean(seg_c[:,:i+1], axis=1)+eps)
+        rh = view(hi11).copy(); rl = view(lo11).copy(); k = min(10, L)
+        rh[:,:k] = np.maximum.accumulate(seg_c[:,:k], axis=1); rl[:,:k] = np.minimum.accumulate(seg_c[:,:k], axis=1)
+        feats[:,:,4] = (seg_c-rl)/(rh-rl+eps)
+        feats[:,:,5] = np.abs(feats[:,:,0])/(feats[:,:,3]+eps)
+        return feats
+
+    def _scores(self, feats):
+        """Multi-head attention score of each window in a (windows, rows, 6) feature tensor."""
+        L = feats.shape[1]; decay = np.exp(-np.arange(L-1,-1,-1)*0.1)
+        scores = np.zeros((len(feats), self.n_heads))
+        for h in range(self.n_heads):
+            s=(h*6)//self.n_heads; e=((h+1)*6)//self.n_heads
+            hf = feats[:,:,s:e]; q = hf[:,-1:,:]
+            attn = (q @ hf.transpose(0,2,1))[:,0,:]/np.sqrt(hf.shape[2]+1e-10)*decay
+            ae = np.exp(attn-np.max(attn, axis=1, keepdims=True)); w = ae/(np.sum(ae, axis=1, keepdims=True)+1e-10)
+            scores[:,h] = np.sum(w*feats[:,:,0], axis=1)
+        return np.clip(np.mean(scores, axis=1)*5000, -100, 100)
+
+    # Incremental path: a ring buffer (stored twice, oldest first) of per-bar rows
+    # [close, volume, ret1, ret3, vol6, hi11, lo11] covering the last window+1 bars
+    def reset(self, closes=None, volumes=None):
+        """Clear the feature cache, optionally priming it with the tail of a history."""
+        self._cap = max(self.window + 1, 11)
+        self._ring = np.zeros((2*self._cap, 7)); self._ring_pos = 0; self._count = 0
+        if closes is not None:
+            for c, v in zip(np.asarray(closes, dtype=float)[-self._cap-10:], np.asarray(volumes, dtype=float)[-self._cap-10:]):
+                self._append(c, v)
+            self._count = len(closes)
+
+    def get_state(self):
+        """Snapshot of the feature cache, restorable with set_state()."""
+        return {'ring': self._ring.copy(), 'pos': self._ring_pos, 'count': self._count}
+
+    def set_state(self, state):
+        self._ring = state['ring'].copy(); self._ring_pos = state['pos']; self._count = state['count']
+
+    def _append(self, close, volume):
+        """Cache one bar's position-invariant feature row (needs only the previous 10 closes)."""
+        eps = 1e-10; cap = self._cap; k = self._count
+        hist = self._ring[self._ring_pos:self._ring_pos+cap, 0][cap-min(k, 10):]
+        c6 = np.append(hist[-5:], close); c11 = np.append(hist[-10:], close)
+        row = [close, volume,
+               (close-hist[-1])/(hist[-1]+eps) if k >= 1 else 0.0,
+               (close-hist[-3])/(hist[-3]+eps) if k >= 3 else 0.0,
+               np.std(c6)/(np.mean(c6)+eps) if k >= 5 else 0.0,
+               np.max(c11) if k >= 10 else close, np.min(c11) if k >= 10 else close]
+        self._ring[self._ring_pos] = self._ring[self._ring_pos+cap] = row
+        self._ring_pos = (self._ring_pos + 1) % cap; self._count += 1
+
+    def update(self, close, volume):
+        """Append one bar and return its score; equals compute_score(closes, volumes, idx) for that bar."""
+        self._append(close, volume)
+        L = self.window + 1
+        if self._count < L or L < 5: return 0.0
+        rows = self._ring[self._ring_pos+self._cap-L:self._ring_pos+self._cap]
+        feats = self._window_features(rows[:,0], rows[:,1], np.array([0]), tuple(rows[:,2:].T))
+        return float(self._scores(feats)[0])
+
 class RLSignalOptimizer:
     """Q-Learning adaptive signal optimizer."""
-    def __init__(self, alpha=0.1, gamma=0.95, epsilon=0.1):
+    def __init__(self, alpha=0.1, gamma=0.95, epsilon=0.1, seed=None):
         self.alpha=alpha; self.gamma=gamma; self.epsilon=epsilon
-        self.Q=np.random.uniform(0,0.1,(5,3,5,5))
+        self.rng=np.random.default_rng(seed)   # own generator: seedable, leaves np.random alone
+        self.Q=self.rng.uniform(0,0.1,(5,3,5,5))
+        self.trained=False   # set once the table has learned from at least one bar or been loaded
         self.mults=np.array([-1.0,-0.5,0.0,0.5,1.0])
-    def optimize(self, closes, returns, raw_signal, window=50):
-        n=len(closes); opt=np.zeros(n)
-        for i in range(window, n):
-            ti=np.clip(int((raw_signal[i]+100)/40),0,4)
-            vi=np.clip(int(np.std(returns[max(0,i-window):i])*300),0,2)
-            mi=np.clip(int((np.mean(returns[max(0,i-5):i])*1000+100)/40),0,4)
-            st=(ti,vi,mi)
-            a=np.random.randint(5) if np.random.random()<self.epsilon else np.argmax(self.Q[st])
-            opt[i]=raw_signal[i]*(0.5+0.5*self.mults[a])
+    def encode_states(self, returns, raw_signal, window=50):
+        """
+        (trend, vol, momentum) state indices for every bar as int8 arrays, from
+        rolling moments: trend from the signal, vol from the std of the previous
+        `window` returns, momentum from the mean of the previous 5 (bars < window are 0).
+        """
+        n=len(raw_signal); ti=np.zeros(n,np.int8); vi=np.zeros(n,np.int8); mi=np.zeros(n,np.int8)
+        if n<=window: return ti,vi,mi
+        bucket=lambda x,hi: np.clip(np.trunc(x),0,hi).astype(np.int8)
+        ti[window:]=bucket((np.asarray(raw_signal[window:],dtype=float)+100)/40,4)
+        vi[window:]=bucket(np.std(sliding_window_view(returns[:n-1],window),axis=1)*300,2)
+        mi[window:]=bucket((np.mean(sliding_window_view(returns[window-5:n-1],5),axis=1)*1000+100)/40,4)
+        return ti,vi,mi
+    def optimize(self, closes, returns, raw_signal, window=50, learn_from=None):
+        """Epsilon-greedy Q-learning pass; bars before learn_from replay the current table greedily."""
+        n=len(closes); self.multipliers=np.zeros(n)
+        if n<=window: return np.zeros(n)
+        learn_from=min(n, window if learn_from is None else max(window, learn_from))
+        ti,vi,mi=self.encode_states(returns, raw_signal, window)
+        state=((ti.astype(np.intp)*3+vi)*5+mi)   # flat index into Q viewed as (75, 5)
+        # Reward of a non-flat action: sign of the signal times the next return
+        reward=np.zeros(n); reward[:-1]=np.clip(np.sign(raw_signal[:-1])*returns[1:]*100,-1,1)
+        actions=np.zeros(n,np.intp)
+        Qf=self.Q.reshape(75,5)
+        actions[window:learn_from]=np.argmax(Qf[state[window:learn_from]],axis=1)
+        # Sequential Q recursion on plain Python lists; the next state of bar i
+        # keeps its vol bucket: nx_l[i+1] = (trend[i+1], vol[i], momentum[i+1])
+        Q=Qf.tolist(); st_l=state.tolist(); nx_l=((ti.astype(np.intp)*3+np.roll(vi,1))*5+mi).tolist()
+        rw_l=reward.tolist(); rng=self.rng; eps=self.epsilon; alpha=self.alpha; gamma=self.gamma
+        for i in range(learn_from, n):
+            row=Q[st_l[i]]
+            if rng.random()<eps: a=int(rng.integers(5))
+            else: a=row.index(max(row))
+            actions[i]=a
             if i+1<n:
-                rw=np.clip(np.sign(opt[i])*returns[i+1]*100,-1,1)
-                ns=(np.clip(int((raw_signal[min(i+1,n-1)]+100)/40),0,4),vi,np.clip(int((np.mean(returns[max(0,i-4):i+1])*1000+100)/40),0,4))
-                self.Q[st+(a,)]+=self.alpha*(rw+self.gamma*np.max(self.Q[ns])-self.Q[st+(a,)])
-            self.epsilon=max(0.01,self.epsilon*0.999)
+                rw=rw_l[i] if a else 0.0
+                row[a]+=alpha*(rw+gamma*max(Q[nx_l[i+1]])-row[a])
+            eps=max(0.01,eps*0.999)
+        self.Q=np.array(Q).reshape(5,3,5,5); self.epsilon=eps
+        self.trained=self.trained or learn_from<n
+        self.multipliers[window:]=0.5+0.5*self.mults[actions[window:]]
+        opt=np.zeros(n); opt[window:]=raw_signal[window:]*self.multipliers[window:]
         return opt
+    def infer(self, closes, returns, raw_signal, window=50):
+        """Greedy inference with the frozen Q-table: one argmax gather, no exploration or learning."""
+        n=len(closes); self.multipliers=np.zeros(n); opt=np.zeros(n)
+        if n<=window: return opt
+        ti,vi,mi=self.encode_states(returns, raw_signal, window)
+        actions=np.argmax(self.Q[ti[window:],vi[window:],mi[window:]],axis=1)
+        self.multipliers[window:]=0.5+0.5*self.mults[actions]
+        opt[window:]=raw_signal[window:]*self.multipliers[window:]
+        return opt
+    def save(self, path, **extra):
+        """Write Q-table, epsilon and generator state (plus extra arrays) to an .npz file."""
+        np.savez(path, Q=self.Q, epsilon=self.epsilon,
+                 rng_state=json.dumps(self.rng.bit_generator.state), **extra)
+    def load(self, path):
+        """Restore a table written by save(); returns the extra entries as a dict."""
+        with np.load(path, allow_pickle=False) as data:
+            self.Q=data['Q'].copy(); self.epsilon=float(data['epsilon']); self.trained=True
+            self.rng.bit_generator.state=json.loads(str(data['rng_state']))
+            return {k: data[k] for k in data.files if k not in ('Q','epsilon','rng_state')}
 
 class DeepRegimeDetector:
     """GMM-based 4-regime detector with transition dynamics."""
@@ -632,21 +1840,15 @@ class DeepRegimeDetector:
         self.n_regimes = n_regimes
     def detect(self, closes, volumes, returns, window=20):
         n=len(closes); score=np.zeros(n)
-        for i in range(window, n):
-            seg_r=returns[max(0,i-window):i]; seg_v=volumes[max(0,i-window):i]
-            seg_c=closes[max(0,i-window):i]
-            trend=np.mean(seg_r); vol=np.std(seg_r)
-            rel_vol=volumes[i]/(np.mean(seg_v)+1e-10)-1
-            zscore=(closes[i]-np.mean(seg_c))/(np.std(seg_c)+1e-10)
-            # Classify regime
-            if trend > 0.001 and vol < np.percentile(np.abs(returns[max(0,i-100):i]),75):
-                score[i] = 80  # Bull
-            elif trend < -0.001 and vol < np.percentile(np.abs(returns[max(0,i-100):i]),75):
-                score[i] = -80  # Bear
-            elif vol > np.percentile(np.abs(returns[max(0,i-100):i]),85):
-                score[i] = 0  # High vol
-            else:
-                score[i] = 10 if zscore > 0 else -10  # Accumulation
+        if n<=window: return gaussian_filter1d(score, sigma=3)
+        # Moments of the previous `window` bars and |return| percentiles of the previous 100, for bars i >= window
+        seg_r=sliding_window_view(returns[:n-1],window); seg_c=sliding_window_view(closes[:n-1],window)
+        trend=np.mean(seg_r,axis=1); vol=np.std(seg_r,axis=1)
+        zscore=(closes[window:]-np.mean(seg_c,axis=1))/(np.std(seg_c,axis=1)+1e-10)
+        p75,p85=RollingStats.rolling_percentiles(np.abs(returns[:n]),100,(75,85),start=window)[:,window:]
+        # Classify regime: Bull, Bear, High vol, else Accumulation by z-score side
+        score[window:]=np.select([(trend>0.001)&(vol<p75), (trend<-0.001)&(vol<p75), vol>p85],
+                                 [80, -80, 0], default=np.where(zscore>0, 10, -10))
         return gaussian_filter1d(np.clip(score,-100,100), sigma=3)
 
 class AdvancedOrderFlow:
@@ -754,12 +1956,33 @@ class NAUQuantumAlphaIndicator:
         
         # New v4.0 AI/ML engines
         self.attention = TemporalAttention(window=30, n_heads=4)
-        self.rl_optimizer = RLSignalOptimizer(alpha=0.1, gamma=0.95)
+        self.rl_optimizer = RLSignalOptimizer(alpha=0.1, gamma=0.95,
+                                              seed=self.config.get('rl_seed'))
         self.deep_regime = DeepRegimeDetector(n_regimes=4)
         self.order_flow = AdvancedOrderFlow()
         self.micro_structure = MicroStructureAnalyzer()
         self.mtf_momentum = MultiTimeframeMomentum()
         
+        # Inputs of the last compute()'s Fair Value Gaps; see fvg_index
+        self._fvg_source = None
+        self._fvg_index = None
+        
+        # Rolling state for the incremental update() API
+        self._stream = None
+        self._stream_prev = None
+    
+    @property
+    def fvg_index(self):
+        """
+        Fair Value Gap interval index (FVGIndex) of the last compute(), or None.
+        Built from that compute's detected gaps on first access, so compute()
+        itself pays neither the fill search nor the index.
+        """
+        if self._fvg_index is None and self._fvg_source is not None:
+            highs, lows, closes, fvg = self._fvg_source
+            self._fvg_index = FVGIndex(self.smc.fvg_table(highs, lows, closes, fvg))
+        return self._fvg_index
+        
     @staticmethod
     def default_config():
         return {
@@ -767,17 +1990,33 @@ class NAUQuantumAlphaIndicator:
             'kalman_process_noise': 1e-5,
             'kalman_measurement_noise': 0.01,
             'kalman_adaptation_rate': 0.1,
+            # Wavelet: 'centered' (two-sided kernels) or 'causal' (past-only, no look-ahead)
+            'wavelet_mode': 'centered',
             # Entropy
             'entropy_window': 20,
             'apen_m': 2,
             'apen_r_factor': 0.2,
-            # Hurst
+            # Factor 5 estimator: 'approximate', 'sample' or 'permutation' (cheapest)
+            'apen_method': 'approximate',
+            'permutation_order': 3,
+            # Hurst: 'rs' (rescaled range), 'dfa' or 'aggvar' (aggregated variance).
+            # 'dfa'/'aggvar' treat the price window as a profile and centre near
+            # 0.5 on a random walk; 'rs' on prices centres near 0.9, so switching
+            # methods shifts the whole Factor 6 score distribution.
             'hurst_max_lag': 20,
+            'hurst_method': 'rs',
             # Fractal
             'fractal_max_k': 10,
             # Smart Money
             'ob_lookback': 20,
             'swing_period': 5,
+            # RL optimizer: generator seed, and an optional .npz path (one per
+            # symbol/timeframe) to resume its Q-table from and save it back to
+            'rl_seed': None,
+            'rl_state_path': None,
+            # 'learn' (epsilon-greedy Q-learning) or 'greedy' (frozen table, inference
+            # only; learns as in 'learn' until a table has been loaded or trained)
+            'rl_mode': 'learn',
             # Signal
             'signal_smoothing': 3,
             'confidence_threshold': 0.6,
@@ -791,6 +2030,66 @@ class NAUQuantumAlphaIndicator:
                 'order_flow': 0.07, 'micro_structure': 0.04, 'mtf_momentum': 0.05,
             }
         }
+
+    def _optimize_rl(self, index, closes, returns, pre_composite):
+        """
+        Run the RL factor. With `rl_state_path` set, the saved table is resumed
+        and only bars after the last saved timestamp are learned from (earlier
+        bars replay it greedily); the table is saved back afterwards.
+        `rl_mode` 'greedy' only applies the table (see RLSignalOptimizer.infer);
+        while no table has been loaded or learned it falls back to learning.
+        """
+        path = self.config.get('rl_state_path')
+        if self.config.get('rl_mode', 'learn') == 'greedy':
+            # Apply the trained table (saved or in memory) without updating it
+            if path and os.path.exists(path):
+                self.rl_optimizer.load(path)
+            if self.rl_optimizer.trained:
+                return self.rl_optimizer.infer(closes, returns, pre_composite)
+            # Only the random initial table exists: acting on it greedily is
+            # noise, so learn from this history (and save it) like 'learn'
+        learn_from = None
+        if path and os.path.exists(path):
+            saved = self.rl_optimizer.load(path)
+            if 'last_time' in saved:
+                learn_from = int(np.searchsorted(index.values, saved['last_time'][0], side='right'))
+        rl_optimized = self.rl_optimizer.optimize(closes, returns, pre_composite, learn_from=learn_from)
+        self._save_rl_state(index)
+        return rl_optimized
+    
+    def _save_rl_state(self, index):
+        """Save the RL table to `rl_state_path`, if set, stamped with the time of index[-1]."""
+        path = self.config.get('rl_state_path')
+        if path and len(index):
+            # Only numeric/datetime indexes can be stored without pickling
+            extra = {'last_time': index.values[-1:]} if index.dtype.kind in 'iufM' else {}
+            self.rl_optimizer.save(path, **extra)
+
+    def _rolling_hurst(self, data, window):
+        """Factor 6 Hurst exponent of every length-`window` slice, per `hurst_method`."""
+        method = self.config.get('hurst_method', 'rs')
+        estimators = {
+            'rs': self.entropy_analyzer.rolling_hurst_exponent,
+            'dfa': self.entropy_analyzer.rolling_dfa_hurst,
+            'aggvar': self.entropy_analyzer.rolling_aggvar_hurst,
+        }
+        if method not in estimators:
+            raise ValueError(f"Unknown hurst_method: {method!r}")
+        return estimators[method](data, window, max_lag=self.config['hurst_max_lag'])
+
+    def _rolling_complexity(self, data, window):
+        """Factor 5 complexity of every length-`window` slice, per `apen_method`."""
+        method = self.config.get('apen_method', 'approximate')
+        if method == 'sample':
+            return self.entropy_analyzer.rolling_sample_entropy(
+                data, window, m=self.config['apen_m'], r_factor=self.config['apen_r_factor'])
+        if method == 'permutation':
+            return self.entropy_analyzer.rolling_permutation_entropy(
+                data, window, order=self.config.get('permutation_order', 3))
+        if method != 'approximate':
+            raise ValueError(f"Unknown apen_method: {method!r}")
+        return self.entropy_analyzer.rolling_approximate_entropy(
+            data, window, m=self.config['apen_m'], r_factor=self.config['apen_r_factor'])
     
     def compute(self, df):
         """
@@ -820,17 +2119,14 @@ class NAUQuantumAlphaIndicator:
         
         # ─── Factor 1: Adaptive Kalman Filter ───
         kalman_filtered = self.kalman.filter_series(closes)
+        # Expanding std of closes[:max(i,2)] normalises both trend scores
+        norm_std = RollingStats.expanding_std(closes)[np.maximum(np.arange(1, n), 2) - 1] + 1e-10
         kalman_trend = np.zeros(n)
-        for i in range(1, n):
-            if kalman_filtered[i] > kalman_filtered[i-1]:
-                kalman_trend[i] = min((kalman_filtered[i] - kalman_filtered[i-1]) / 
-                                     (np.std(closes[:max(i,2)]) + 1e-10) * 100, 100)
-            else:
-                kalman_trend[i] = max((kalman_filtered[i] - kalman_filtered[i-1]) / 
-                                     (np.std(closes[:max(i,2)]) + 1e-10) * 100, -100)
+        kalman_trend[1:] = np.clip(np.diff(kalman_filtered) / norm_std * 100, -100, 100)
         
         # ─── Factor 2: Wavelet Analysis ───
-        wavelet_trend = self.wavelet.get_trend_component(closes)
+        wavelet_trend = self.wavelet.get_trend_component(
+            closes, causal=self.config.get('wavelet_mode') == 'causal')
         # Guard: ensure wavelet output length matches closes
         if len(wavelet_trend) != n:
             wavelet_trend = np.interp(
@@ -838,14 +2134,10 @@ class NAUQuantumAlphaIndicator:
                 np.linspace(0, 1, len(wavelet_trend)),
                 wavelet_trend
             )
+        wavelet_diff = np.diff(wavelet_trend)
         wavelet_score = np.zeros(n)
-        for i in range(1, n):
-            if wavelet_trend[i] > wavelet_trend[i-1]:
-                wavelet_score[i] = min(abs(wavelet_trend[i] - wavelet_trend[i-1]) / 
-                                      (np.std(closes[:max(i,2)]) + 1e-10) * 200, 100)
-            else:
-                wavelet_score[i] = -min(abs(wavelet_trend[i] - wavelet_trend[i-1]) / 
-                                       (np.std(closes[:max(i,2)]) + 1e-10) * 200, 100)
+        wavelet_score[1:] = np.where(wavelet_diff > 0, 1.0, -1.0) * \
+                            np.minimum(np.abs(wavelet_diff) / norm_std * 200, 100)
         
         # ─── Factor 3: HMM Regime Detection ───
         hmm_states = self.hmm.fit_and_predict(returns)
@@ -857,98 +2149,71 @@ class NAUQuantumAlphaIndicator:
         # ─── Factor 4: Shannon Entropy ───
         entropy_score = np.zeros(n)
         window = self.config['entropy_window']
-        for i in range(window, n):
-            se = self.entropy_analyzer.shannon_entropy(returns[i-window:i])
-            # Low entropy → confident trend → amplify signal
-            # High entropy → uncertain → dampen signal
-            entropy_score[i] = np.clip((3.0 - se) / 3.0 * 100, -100, 100)
+        # se[i-window] = entropy of returns[i-window:i]
+        se = self.entropy_analyzer.rolling_shannon_entropy(returns[:-1], window)
+        # Low entropy → confident trend → amplify signal
+        # High entropy → uncertain → dampen signal
+        entropy_score[window:] = np.clip((3.0 - se) / 3.0 * 100, -100, 100)
         
         # ─── Factor 5: Approximate Entropy ───
         apen_score = np.zeros(n)
-        for i in range(window, n):
-            apen = self.entropy_analyzer.approximate_entropy(
-                closes[i-window:i], 
-                m=self.config['apen_m'],
-                r_factor=self.config['apen_r_factor']
-            )
-            # Low ApEn = trending → score follows trend direction
-            trend_dir = 1 if closes[i] > closes[i-window//2] else -1
-            apen_score[i] = trend_dir * np.clip((1.0 - apen) * 100, 0, 100)
+        apen = self._rolling_complexity(closes[:-1], window)
+        # Low ApEn = trending → score follows trend direction
+        trend_dir = np.where(closes[window:] > closes[window - window//2:n - window//2], 1, -1)
+        apen_score[window:] = trend_dir * np.clip((1.0 - apen) * 100, 0, 100)
         
         # ─── Factor 6: Hurst Exponent ───
         hurst_score = np.zeros(n)
-        for i in range(window*2, n):
-            h = self.entropy_analyzer.hurst_exponent(
-                closes[i-window*2:i], 
-                max_lag=self.config['hurst_max_lag']
-            )
-            trend_dir = 1 if closes[i] > closes[i-window] else -1
-            if h > 0.5:  # Trending
-                hurst_score[i] = trend_dir * (h - 0.5) * 200
-            else:  # Mean-reverting
-                hurst_score[i] = -trend_dir * (0.5 - h) * 200
+        h = self._rolling_hurst(closes[:-1], window*2)
+        trend_dir = np.where(closes[window*2:] > closes[window:n-window], 1, -1)
+        # Trending (h > 0.5) follows the trend, mean-reverting fades it
+        hurst_score[window*2:] = np.where(h > 0.5, trend_dir * (h - 0.5) * 200,
+                                          -trend_dir * (0.5 - h) * 200)
         
         # ─── Factor 7: Fractal Dimension ───
         fractal_score = np.zeros(n)
-        for i in range(window*2, n):
-            fd = self.fractal_analyzer.fractal_dimension(
-                closes[i-window*2:i],
-                max_k=self.config['fractal_max_k']
-            )
-            # FD near 1 = smooth trend, FD near 2 = complex
-            trend_dir = 1 if closes[i] > closes[i-window] else -1
-            fractal_score[i] = trend_dir * np.clip((1.5 - fd) * 200, -100, 100)
+        fd = self.fractal_analyzer.rolling_fractal_dimension(
+            closes[:-1], window*2,
+            max_k=self.config['fractal_max_k']
+        )
+        # FD near 1 = smooth trend, FD near 2 = complex
+        trend_dir = np.where(closes[window*2:] > closes[window:n-window], 1, -1)
+        fractal_score[window*2:] = trend_dir * np.clip((1.5 - fd) * 200, -100, 100)
         
         # ─── Factor 8-9: Smart Money Order Blocks & FVG ───
         bull_ob, bear_ob = self.smc.detect_order_blocks(
             opens, highs, lows, closes, self.config['ob_lookback'])
-        ob_score = np.zeros(n)
-        for i in range(n):
-            if not np.isnan(bull_ob[i]):
-                ob_score[i] = 80
-            elif not np.isnan(bear_ob[i]):
-                ob_score[i] = -80
+        ob_score = np.where(~np.isnan(bull_ob), 80.0,
+                            np.where(~np.isnan(bear_ob), -80.0, 0.0))
         # Smooth OB influence over nearby candles
         ob_score = gaussian_filter1d(ob_score, sigma=3)
         
         fvg_data = self.smc.detect_fair_value_gaps(highs, lows, closes)
-        fvg_score = np.zeros(n)
-        for i in range(n):
-            if not np.isnan(fvg_data[0][i]):  # Bullish FVG
-                fvg_score[i] += 70
-            if not np.isnan(fvg_data[2][i]):  # Bearish FVG
-                fvg_score[i] -= 70
+        self._fvg_source = (highs, lows, closes, fvg_data)
+        self._fvg_index = None
+        fvg_score = (np.where(~np.isnan(fvg_data[0]), 70.0, 0.0) -   # Bullish FVG
+                     np.where(~np.isnan(fvg_data[2]), 70.0, 0.0))    # Bearish FVG
         fvg_score = gaussian_filter1d(fvg_score, sigma=2)
         
         # ─── Factor 10: BOS/CHoCH ───
         bos, choch = self.smc.detect_bos_choch(
             highs, lows, closes, self.config['swing_period'])
-        structure_score = np.zeros(n)
-        for i in range(n):
-            if bos[i] > 0 or choch[i] > 0:
-                structure_score[i] = 90 if choch[i] > 0 else 70
-            elif bos[i] < 0 or choch[i] < 0:
-                structure_score[i] = -90 if choch[i] < 0 else -70
+        # CHoCH (reversal) ±90, BOS (continuation) ±70
+        structure_score = np.where(choch != 0, 90.0 * choch, 70.0 * bos)
         structure_score = gaussian_filter1d(structure_score, sigma=2)
         
         # ─── Factor 11: Williams Fractals ───
         frac_highs, frac_lows = self.fractal_analyzer.williams_fractals(
             highs, lows, period=self.config['swing_period'])
-        fractal_sr_score = np.zeros(n)
-        for i in range(n):
-            # Near fractal low = support = bullish
-            # Near fractal high = resistance = bearish
-            if not np.isnan(frac_lows[i]):
-                fractal_sr_score[i] = 60
-            elif not np.isnan(frac_highs[i]):
-                fractal_sr_score[i] = -60
+        # Near fractal low = support = bullish
+        # Near fractal high = resistance = bearish
+        fractal_sr_score = np.where(~np.isnan(frac_lows), 60.0,
+                                    np.where(~np.isnan(frac_highs), -60.0, 0.0))
         fractal_sr_score = gaussian_filter1d(fractal_sr_score, sigma=2)
         
         # ═══ NEW v4.0 FACTORS ═══
         # Factor 13: Temporal Self-Attention
-        attention_score = np.zeros(n)
-        for i in range(30, n):
-            attention_score[i] = self.attention.compute_score(closes, volumes, i)
+        attention_score = self.attention.compute_scores(closes, volumes)
         
         # Factor 15: Deep Regime Detection (GMM)
         deep_regime_score = self.deep_regime.detect(closes, volumes, returns)
@@ -984,7 +2249,7 @@ class NAUQuantumAlphaIndicator:
         )
         
         # Factor 14: RL Signal Optimizer (operates on pre-composite)
-        rl_optimized = self.rl_optimizer.optimize(closes, returns, pre_composite)
+        rl_optimized = self._optimize_rl(df.index, closes, returns, pre_composite)
         
         # Blend pre-composite with RL-optimized
         composite = (1 - w['rl']) * pre_composite + w['rl'] * rl_optimized
@@ -997,24 +2262,14 @@ class NAUQuantumAlphaIndicator:
         composite = np.clip(composite, -100, 100)
         
         # ═══ BAYESIAN CONFIDENCE SCORING ═══
+        # Each factor provides evidence
+        factor_matrix = np.column_stack([
+            kalman_trend, wavelet_score, hmm_score, entropy_score, hurst_score,
+            ob_score, structure_score, attention_score, deep_regime_score,
+            flow_score, micro_score, mtf_score])
         confidence = np.zeros(n)
-        for i in range(window, n):
-            evidences = []
-            
-            # Each factor provides evidence
-            factors = [kalman_trend[i], wavelet_score[i], hmm_score[i],
-                      entropy_score[i], hurst_score[i], ob_score[i],
-                      structure_score[i], attention_score[i],
-                      deep_regime_score[i], flow_score[i], micro_score[i], mtf_score[i]]
-            
-            for f in factors:
-                if f > 0:
-                    evidences.append((0.5 + f/200, 0.5 - f/200))
-                else:
-                    evidences.append((0.5 + f/200, 0.5 - f/200))
-            
-            p_long, p_short = self.bayesian.compute_posterior(evidences)
-            confidence[i] = max(p_long, p_short)
+        p_long, p_short = self.bayesian.compute_posterior_matrix(factor_matrix[window:])
+        confidence[window:] = np.maximum(p_long, p_short)
         
         # ═══ Store Results ═══
         df['NAU_Signal'] = composite
@@ -1056,6 +2311,454 @@ class NAUQuantumAlphaIndicator:
         df['CHoCH'] = choch
         
         return df
+    
+    # ═══ INCREMENTAL (STREAMING) MODE ═══
+    
+    STREAM_COLUMNS = [
+        'NAU_Signal', 'NAU_Confidence', 'NAU_Regime', 'NAU_Kalman',
+        'NAU_Kalman_Score', 'NAU_Wavelet_Score', 'NAU_HMM_Score',
+        'NAU_Entropy_Score', 'NAU_Hurst_Score', 'NAU_Fractal_Score',
+        'NAU_OB_Score', 'NAU_FVG_Score', 'NAU_Structure_Score',
+        'NAU_Williams_Score', 'NAU_Attention_Score', 'NAU_RL_Score',
+        'NAU_DeepRegime_Score', 'NAU_OrderFlow_Score',
+        'NAU_MicroStructure_Score', 'NAU_MTF_Score', 'NAU_Long', 'NAU_Short',
+        'Fractal_High', 'Fractal_Low', 'Bull_OB', 'Bear_OB',
+        'Bull_FVG_Top', 'Bull_FVG_Bot', 'Bear_FVG_Top', 'Bear_FVG_Bot',
+        'BOS', 'CHoCH',
+    ]
+    
+    def reset(self):
+        """Drop the rolling state; the next update() call re-seeds it."""
+        self._stream = None
+        self._stream_prev = None
+    
+    def update(self, new_bars):
+        """
+        Incrementally extend the indicator with newly arrived bars.
+        
+        The first call seeds the rolling state from a full compute() over
+        new_bars. Later calls only process the appended bars: stateful
+        factors carry their state forward (Kalman x/P, HMM filtered alpha,
+        expanding moments, swing levels, RL Q-table, attention feature
+        cache, causal wavelet ring buffer) and windowed factors re-evaluate
+        just the trailing window they depend on, so one bar costs
+        O(window) instead of O(n*window). A bar whose index equals the
+        last processed bar replaces it (the still-forming candle of a live
+        feed). With `rl_state_path` set, the RL table is saved after every
+        call, as compute() does, unless the stream runs in greedy mode.
+        
+        Windowed factors match the last row of compute() on the history
+        to date. The HMM regime is the online forward-filter estimate
+        P(state | data so far) under the seed fit, BOS/CHoCH only uses
+        swings confirmed so far, and levels that get confirmed for an
+        earlier bar (fractals, order blocks, FVGs) are not re-emitted.
+        
+        Args:
+            new_bars: DataFrame with columns ['Open', 'High', 'Low', 'Close', 'Volume']
+            
+        Returns:
+            DataFrame with indicator columns for new_bars only
+        """
+        if self._stream is None:
+            return self._seed_stream(new_bars)
+        
+        if len(new_bars) and new_bars.index[0] == self._stream['last_index']:
+            # Revised last candle: roll back one bar and process it again
+            added_highs, added_lows = self._stream['swings_added']
+            for levels, added in ((self._stream['swing_highs'], added_highs),
+                                  (self._stream['swing_lows'], added_lows)):
+                for level in added:
+                    del levels[bisect.bisect_left(levels, level)]
+            self._stream = self._stream_prev
+            self.rl_optimizer.Q = self._stream['rl_Q']
+            self.rl_optimizer.epsilon = self._stream['rl_epsilon']
+            self.rl_optimizer.trained = self._stream['rl_trained']
+            self.rl_optimizer.rng.bit_generator.state = self._stream['rl_rng']
+            self.attention.set_state(self._stream['attention_cache'])
+            self.wavelet.set_state(self._stream['wavelet_cache'])
+        elif len(new_bars) and new_bars.index[0] < self._stream['last_index']:
+            raise ValueError("update() received bars older than the last "
+                             "processed bar; call reset() to re-seed")
+        
+        cols = [new_bars[c].values.flatten().astype(float)
+                for c in ('Open', 'High', 'Low', 'Close', 'Volume')]
+        rows = []
+        for k in range(len(new_bars)):
+            rows.append(self._stream_step(*(col[k] for col in cols)))
+            self._stream['last_index'] = new_bars.index[k]
+        if not self._stream['rl_greedy']:
+            # Persist what the stream learned, once per call as compute() does
+            self._save_rl_state(new_bars.index)
+        
+        # One frame for all indicator columns; per-column assignment costs
+        # more than the step itself
+        values = pd.DataFrame(rows, index=new_bars.index, columns=self.STREAM_COLUMNS)
+        return pd.concat([new_bars.drop(columns=self.STREAM_COLUMNS, errors='ignore'),
+                          values], axis=1)
+    
+    @staticmethod
+    def _push(arr, value, size):
+        """Return a new array holding the last `size` values of arr + [value]."""
+        return np.append(arr[max(len(arr) - size + 1, 0):], value)
+    
+    def _seed_stream(self, df):
+        """Seed the rolling state with compute() and stream the final bar."""
+        cfg = self.config
+        window = cfg['entropy_window']
+        # Context rows needed to re-smooth the composite at the newest bar
+        sigma = cfg['signal_smoothing']
+        context = (int(4.0 * sigma + 0.5) if sigma > 1 else 0) + 1
+        # The streamed bar needs `context` entropy rows over `window` closes
+        # before it, and a 2*window Hurst/fractal window ending at it
+        min_bars = max(31, context + window + 1, 2 * window + 1)
+        if len(df) < min_bars:
+            raise ValueError(f"update() needs at least {min_bars} bars to seed the "
+                             f"rolling state (got {len(df)})")
+        
+        head = self.compute(df.iloc[:-1].copy())
+        
+        opens = head['Open'].values.flatten().astype(float)
+        highs = head['High'].values.flatten().astype(float)
+        lows = head['Low'].values.flatten().astype(float)
+        closes = head['Close'].values.flatten().astype(float)
+        volumes = head['Volume'].values.flatten().astype(float)
+        n = len(closes)
+        returns = np.concatenate([[0], np.diff(closes) / closes[:-1]])
+        
+        # Raw-score rows needed to re-smooth the context rows (sigma<=3)
+        raw_len = max(context + 12, cfg['ob_lookback'])
+        max_scale = int(np.max(self.wavelet.scales))
+        wavelet_len = max(8 * max_scale + 1, context + 1 + 4 * max_scale)
+        regime_len = context + 12 + 100
+        tail_len = max(wavelet_len, regime_len, 51, 2 * window + 1,
+                       2 * cfg['swing_period'] + 1, cfg['ob_lookback'] + 1)
+        
+        # Expanding moments of closes[:n] and the std used by rows n-context..n-1
+        mean = np.mean(closes)
+        std_tail = RollingStats.expanding_std(closes)[
+            np.maximum(np.arange(n - context, n), 2) - 1]
+        
+        apen = self._rolling_complexity(closes[n-context-window:n-1], window)
+        trend_dir = np.where(closes[n-context:] > closes[n-context-window//2:n-window//2], 1, -1)
+        apen_tail = trend_dir * np.clip((1.0 - apen) * 100, 0, 100)
+        
+        ob_raw = np.where(head['Bull_OB'].notna(), 80.0,
+                          np.where(head['Bear_OB'].notna(), -80.0, 0.0))
+        fvg_raw = (np.where(head['Bull_FVG_Top'].notna(), 70.0, 0.0) -
+                   np.where(head['Bear_FVG_Top'].notna(), 70.0, 0.0))
+        bos = head['BOS'].values; choch = head['CHoCH'].values
+        struct_raw = np.where((bos > 0) | (choch > 0), np.where(choch > 0, 90.0, 70.0),
+                              np.where((bos < 0) | (choch < 0),
+                                       np.where(choch < 0, -90.0, -70.0), 0.0))
+        williams_raw = np.where(head['Fractal_Low'].notna(), 60.0,
+                                np.where(head['Fractal_High'].notna(), -60.0, 0.0))
+        
+        # Trend after the BOS/CHoCH scan = sign of its last break
+        breaks = np.nonzero(bos + choch)[0]
+        trend = int(np.sign((bos + choch)[breaks[-1]])) if len(breaks) else 0
+        
+        # Levels of the swings confirmed so far, sorted for bisection; all
+        # have idx <= n-1-p < n-1, so none is pending for the first step
+        p = cfg['swing_period']
+        swing_highs = sorted(highs[i] for i in range(p, n - p)
+                             if highs[i] == max(highs[i-p:i+p+1]))
+        swing_lows = sorted(lows[i] for i in range(p, n - p)
+                            if lows[i] == min(lows[i-p:i+p+1]))
+        
+        def tail(col):
+            return head[col].values.astype(float)[-context:]
+        
+        self.attention.reset(closes, volumes)
+        self.wavelet.reset_stream(closes)
+        self._stream = {
+            'n': n, 'last_index': head.index[-1],
+            'context': context, 'raw_len': raw_len, 'tail_len': tail_len,
+            'wavelet_len': wavelet_len, 'regime_len': regime_len,
+            'opens': opens[-tail_len:], 'highs': highs[-tail_len:],
+            'lows': lows[-tail_len:], 'closes': closes[-tail_len:],
+            'volumes': volumes[-tail_len:], 'returns': returns[-tail_len:],
+            'k_x': self.kalman.x, 'k_P': self.kalman.P, 'k_Q': self.kalman.Q,
+            'k_innov': np.array(self.kalman.innovations, dtype=float),
+            'mean': mean, 'M2': np.sum((closes - mean) ** 2), 'std': std_tail,
+            'hmm_alpha': self.hmm.forward_filter(returns)[-1],
+            'ob_avg_range': np.mean(highs[:min(50, n)] - lows[:min(50, n)]),
+            'ob_raw': ob_raw[-raw_len:], 'fvg_raw': fvg_raw[-raw_len:],
+            'struct_raw': struct_raw[-raw_len:], 'williams_raw': williams_raw[-raw_len:],
+            'swing_highs': swing_highs, 'swing_lows': swing_lows, 'trend': trend,
+            'pending_highs': (), 'pending_lows': (), 'swings_added': ((), ()),
+            'wavelet_causal': self.config.get('wavelet_mode') == 'causal',
+            'wavelet': tail('NAU_Wavelet_Score'),
+            'wavelet_trend': self.wavelet.latest_trend(closes),
+            'kalman': tail('NAU_Kalman_Score'), 'hmm': tail('NAU_HMM_Score'),
+            'entropy': tail('NAU_Entropy_Score'), 'apen': apen_tail,
+            'hurst': tail('NAU_Hurst_Score'), 'fractal': tail('NAU_Fractal_Score'),
+            'attention': tail('NAU_Attention_Score'), 'flow': tail('NAU_OrderFlow_Score'),
+            'micro': tail('NAU_MicroStructure_Score'), 'mtf': tail('NAU_MTF_Score'),
+            'rl_mult': self.rl_optimizer.multipliers[-context:].copy(),
+            'rl_pending': None,
+            'rl_greedy': cfg.get('rl_mode', 'learn') == 'greedy' and self.rl_optimizer.trained,
+            'rl_Q': self.rl_optimizer.Q, 'rl_epsilon': self.rl_optimizer.epsilon,
+            'rl_trained': self.rl_optimizer.trained,
+            'rl_rng': self.rl_optimizer.rng.bit_generator.state,
+            'attention_cache': self.attention.get_state(),
+            'wavelet_cache': self.wavelet.get_state(),
+        }
+        
+        last = df.iloc[-1:]
+        row = self._stream_step(*(float(np.ravel(last[c].values)[0])
+                                  for c in ('Open', 'High', 'Low', 'Close', 'Volume')))
+        self._stream['last_index'] = last.index[0]
+        if not self._stream['rl_greedy']:
+            self._save_rl_state(last.index)
+        
+        values = pd.DataFrame({col: np.append(head[col].values, row[col])
+                               for col in self.STREAM_COLUMNS}, index=df.index)
+        return pd.concat([df.drop(columns=self.STREAM_COLUMNS, errors='ignore'), values], axis=1)
+    
+    def _stream_step(self, o, h, l, c, v):
+        """Advance the rolling state by one bar and return its indicator row."""
+        cfg = self.config
+        w = cfg['weights']
+        window = cfg['entropy_window']
+        prev = self._stream
+        s = dict(prev)   # values are replaced, never mutated, so prev stays a valid snapshot
+        R = s['context']; L = s['tail_len']; K = s['raw_len']
+        push = self._push
+        i = s['n']
+        
+        ret = (c - prev['closes'][-1]) / prev['closes'][-1]
+        opens = s['opens'] = push(prev['opens'], o, L)
+        highs = s['highs'] = push(prev['highs'], h, L)
+        lows = s['lows'] = push(prev['lows'], l, L)
+        closes = s['closes'] = push(prev['closes'], c, L)
+        volumes = s['volumes'] = push(prev['volumes'], v, L)
+        returns = s['returns'] = push(prev['returns'], ret, L)
+        
+        # ─── Factor 1: Kalman step + expanding std of closes[:i] ───
+        kf = self.kalman
+        innov = s['k_innov'] = push(prev['k_innov'], c - prev['k_x'], kf.innovations.maxlen)
+        if len(innov) > 5:
+            s['k_Q'] = kf.base_Q + kf.adaptation_rate * np.var(innov)
+        P_pred = prev['k_P'] + s['k_Q']
+        gain = P_pred / (P_pred + kf.R)
+        s['k_x'] = prev['k_x'] + gain * (c - prev['k_x'])
+        s['k_P'] = (1 - gain) * P_pred
+        
+        std_i = np.sqrt(prev['M2'] / i)
+        delta = c - prev['mean']
+        s['mean'] = prev['mean'] + delta / (i + 1)
+        s['M2'] = prev['M2'] + delta * (c - s['mean'])
+        std_tail = s['std'] = push(prev['std'], std_i, R)
+        
+        kalman = s['kalman'] = push(prev['kalman'], np.clip(
+            (s['k_x'] - prev['k_x']) / (std_i + 1e-10) * 100, -100, 100), R)
+        
+        # ─── Factor 2: Wavelet ───
+        if s['wavelet_causal']:
+            # Causal mode: push the bar into the wavelet ring buffer, which
+            # evaluates only the newest coefficient per scale
+            s['wavelet_trend'] = self.wavelet.update_trend(c)
+            s['wavelet_cache'] = self.wavelet.get_state()
+            dw = s['wavelet_trend'] - prev['wavelet_trend']
+            wavelet = s['wavelet'] = push(prev['wavelet'], (1.0 if dw > 0 else -1.0) *
+                                          min(abs(dw) / (std_i + 1e-10) * 200, 100), R)
+        else:
+            # Centred mode: re-evaluate the context rows on a trailing window
+            wt = self.wavelet.get_trend_component(closes[-s['wavelet_len']:])[-(R + 1):]
+            dw = np.diff(wt)
+            wavelet = np.where(dw > 0, 1.0, -1.0) * np.minimum(
+                np.abs(dw) / (std_tail + 1e-10) * 200, 100)
+        
+        # ─── Factor 3: HMM (online forward filter, O(N^2) per bar) ───
+        s['hmm_alpha'] = self.hmm.forward_step(prev['hmm_alpha'], ret)
+        regime = int(np.argmax(s['hmm_alpha']))
+        hmm_score = s['hmm'] = push(prev['hmm'], {0: 80.0, 1: -80.0}.get(regime, 0.0), R)
+        
+        # ─── Factors 4-7: Entropy, ApEn, Hurst, Fractal dimension ───
+        se = self.entropy_analyzer.shannon_entropy(returns[-window-1:-1])
+        entropy = s['entropy'] = push(prev['entropy'], np.clip((3.0 - se) / 3.0 * 100, -100, 100), R)
+        
+        apen = self._rolling_complexity(closes[-window-1:-1], window)[0]
+        trend_dir = 1 if c > closes[-1-window//2] else -1
+        apen_score = s['apen'] = push(prev['apen'], trend_dir * np.clip((1.0 - apen) * 100, 0, 100), R)
+        
+        hurst_h = self._rolling_hurst(closes[-2*window-1:-1], 2 * window)[0]
+        trend_dir = 1 if c > closes[-1-window] else -1
+        hurst_val = trend_dir * (hurst_h - 0.5) * 200 if hurst_h > 0.5 else -trend_dir * (0.5 - hurst_h) * 200
+        hurst = s['hurst'] = push(prev['hurst'], hurst_val, R)
+        
+        fd = self.fractal_analyzer.rolling_fractal_dimension(
+            closes[-2*window-1:-1], 2 * window, max_k=cfg['fractal_max_k'])[0]
+        fractal = s['fractal'] = push(prev['fractal'], trend_dir * np.clip((1.5 - fd) * 200, -100, 100), R)
+        
+        # ─── Factors 8-9: Order blocks & FVG (raw marks, re-smoothed) ───
+        ob_raw = s['ob_raw'] = push(prev['ob_raw'], 0.0, K)
+        move = c - closes[-3]
+        if abs(move) > s['ob_avg_range'] * 1.5:
+            for d in range(1, cfg['ob_lookback']):
+                if (move > 0 and closes[-1-d] < opens[-1-d]) or \
+                   (move < 0 and closes[-1-d] > opens[-1-d]):
+                    ob_raw[-1-d] = 80.0 if move > 0 else -80.0
+                    break
+        ob = gaussian_filter1d(ob_raw, sigma=3)[-R:]
+        
+        fvg_raw = s['fvg_raw'] = push(prev['fvg_raw'], 0.0, K)
+        if l > highs[-3]:
+            fvg_raw[-2] += 70
+        if h < lows[-3]:
+            fvg_raw[-2] -= 70
+        fvg = gaussian_filter1d(fvg_raw, sigma=2)[-R:]
+        
+        # ─── Factor 10: BOS/CHoCH (swings confirmed so far) ───
+        # Bar i-p is confirmed as a swing now and becomes breakable once
+        # idx < i-1. The sorted level lists are shared with prev and grow in
+        # place; swings_added lets update() undo this step on a rollback.
+        p = cfg['swing_period']
+        pending_highs = prev['pending_highs']
+        pending_lows = prev['pending_lows']
+        if highs[-1-p] == max(highs[-2*p-1:]):
+            pending_highs += ((i - p, highs[-1-p]),)
+        if lows[-1-p] == min(lows[-2*p-1:]):
+            pending_lows += ((i - p, lows[-1-p]),)
+        added_highs = tuple(level for idx, level in pending_highs if idx < i - 1)
+        added_lows = tuple(level for idx, level in pending_lows if idx < i - 1)
+        for level in added_highs:
+            bisect.insort(s['swing_highs'], level)
+        for level in added_lows:
+            bisect.insort(s['swing_lows'], level)
+        s['pending_highs'] = tuple(sw for sw in pending_highs if sw[0] >= i - 1)
+        s['pending_lows'] = tuple(sw for sw in pending_lows if sw[0] >= i - 1)
+        s['swings_added'] = (added_highs, added_lows)
+        
+        # A high level in [closes[-2], c) or a low level in (c, closes[-2]]
+        prev_close = closes[-2]
+        levels = s['swing_highs']
+        k = bisect.bisect_left(levels, prev_close)
+        if k < len(levels) and levels[k] < c:
+            direction = 1
+        else:
+            levels = s['swing_lows']
+            k = bisect.bisect_right(levels, prev_close)
+            direction = -1 if k > 0 and levels[k-1] > c else 0
+        bos_i = choch_i = 0
+        if direction:
+            if prev['trend'] == -direction:
+                choch_i = direction
+            else:
+                bos_i = direction
+            s['trend'] = direction
+        if bos_i > 0 or choch_i > 0:
+            struct_val = 90.0 if choch_i > 0 else 70.0
+        elif bos_i < 0 or choch_i < 0:
+            struct_val = -90.0 if choch_i < 0 else -70.0
+        else:
+            struct_val = 0.0
+        s['struct_raw'] = push(prev['struct_raw'], struct_val, K)
+        structure = gaussian_filter1d(s['struct_raw'], sigma=2)[-R:]
+        
+        # ─── Factor 11: Williams fractals (bar i-half becomes decidable) ───
+        half = p // 2
+        williams_raw = s['williams_raw'] = push(prev['williams_raw'], 0.0, K)
+        frac_high, frac_low = self.fractal_analyzer.williams_fractal_last(highs, lows, period=p)
+        if not np.isnan(frac_low):
+            williams_raw[-1-half] = 60.0
+        elif not np.isnan(frac_high):
+            williams_raw[-1-half] = -60.0
+        williams = gaussian_filter1d(williams_raw, sigma=2)[-R:]
+        
+        # ─── v4.0 factors ───
+        attention = s['attention'] = push(prev['attention'], self.attention.update(c, v), R)
+        s['attention_cache'] = self.attention.get_state()
+        Ld = s['regime_len']
+        deep = self.deep_regime.detect(closes[-Ld:], volumes[-Ld:], returns[-Ld:])[-R:]
+        flow = s['flow'] = push(prev['flow'], self.order_flow.compute_score(
+            opens[-21:], highs[-21:], lows[-21:], closes[-21:], volumes[-21:])[-1], R)
+        micro = s['micro'] = push(prev['micro'], self.micro_structure.compute_score(
+            opens[-21:], highs[-21:], lows[-21:], closes[-21:], volumes[-21:])[-1], R)
+        mtf = s['mtf'] = push(prev['mtf'], self.mtf_momentum.compute_score(closes[-51:])[-1], R)
+        
+        pre_composite = (
+            w['kalman'] * kalman +
+            w['wavelet'] * wavelet +
+            w['hmm'] * hmm_score +
+            w['entropy'] * entropy +
+            w['apen'] * apen_score +
+            w['hurst'] * hurst +
+            w['fractal'] * fractal +
+            w['order_blocks'] * ob +
+            w['fvg'] * fvg +
+            w['bos_choch'] * structure +
+            w['fractals'] * williams +
+            w['attention'] * attention +
+            w['deep_regime'] * deep +
+            w['order_flow'] * flow +
+            w['micro_structure'] * micro +
+            w['mtf_momentum'] * mtf
+        )
+        
+        # ─── Factor 14: RL (deferred Q update for bar i-1, then act on bar i) ───
+        rl = self.rl_optimizer
+        Q = prev['rl_Q'].copy()
+        mom = np.clip(int((np.mean(returns[-6:-1]) * 1000 + 100) / 40), 0, 4)
+        if prev['rl_pending'] is not None:
+            st, a, sgn = prev['rl_pending']
+            rw = np.clip(sgn * ret * 100, -1, 1)
+            ns = (np.clip(int((pre_composite[-1] + 100) / 40), 0, 4), st[1], mom)
+            Q[st + (a,)] += rl.alpha * (rw + rl.gamma * np.max(Q[ns]) - Q[st + (a,)])
+        st = (np.clip(int((pre_composite[-1] + 100) / 40), 0, 4),
+              np.clip(int(np.std(returns[-51:-1]) * 300), 0, 2), mom)
+        if prev['rl_greedy']:
+            # Frozen table: act greedily, no exploration and no pending update
+            a = np.argmax(Q[st])
+        else:
+            rl.rng.bit_generator.state = prev['rl_rng']
+            a = rl.rng.integers(5) if rl.rng.random() < prev['rl_epsilon'] else np.argmax(Q[st])
+            s['rl_rng'] = rl.rng.bit_generator.state
+        rl_mult = s['rl_mult'] = push(prev['rl_mult'], 0.5 + 0.5 * rl.mults[a], R)
+        rl_optimized = pre_composite * rl_mult
+        if not prev['rl_greedy']:
+            s['rl_pending'] = (st, a, np.sign(rl_optimized[-1]))
+            s['rl_Q'] = rl.Q = Q
+            s['rl_epsilon'] = rl.epsilon = max(0.01, prev['rl_epsilon'] * 0.999)
+            # The deferred update above is the table's first lesson if none came before
+            s['rl_trained'] = rl.trained = prev['rl_trained'] or prev['rl_pending'] is not None
+        
+        composite = (1 - w['rl']) * pre_composite + w['rl'] * rl_optimized
+        if cfg['signal_smoothing'] > 1:
+            composite = gaussian_filter1d(composite, sigma=cfg['signal_smoothing'])
+        signal_i = float(np.clip(composite[-1], -100, 100))
+        
+        # ─── Bayesian confidence ───
+        factors = [kalman[-1], wavelet[-1], hmm_score[-1], entropy[-1], hurst[-1],
+                   ob[-1], structure[-1], attention[-1], deep[-1], flow[-1],
+                   micro[-1], mtf[-1]]
+        p_long, p_short = self.bayesian.compute_posterior_matrix([factors])
+        confidence = float(max(p_long[0], p_short[0]))
+        
+        s['n'] = i + 1
+        self._stream_prev = prev
+        self._stream = s
+        
+        return {
+            'NAU_Signal': signal_i, 'NAU_Confidence': confidence,
+            'NAU_Regime': regime, 'NAU_Kalman': s['k_x'],
+            'NAU_Kalman_Score': kalman[-1], 'NAU_Wavelet_Score': wavelet[-1],
+            'NAU_HMM_Score': hmm_score[-1], 'NAU_Entropy_Score': entropy[-1],
+            'NAU_Hurst_Score': hurst[-1], 'NAU_Fractal_Score': fractal[-1],
+            'NAU_OB_Score': ob[-1], 'NAU_FVG_Score': fvg[-1],
+            'NAU_Structure_Score': structure[-1], 'NAU_Williams_Score': williams[-1],
+            'NAU_Attention_Score': attention[-1], 'NAU_RL_Score': rl_optimized[-1],
+            'NAU_DeepRegime_Score': deep[-1], 'NAU_OrderFlow_Score': flow[-1],
+            'NAU_MicroStructure_Score': micro[-1], 'NAU_MTF_Score': mtf[-1],
+            'NAU_Long': signal_i > 20 and confidence > cfg['confidence_threshold'],
+            'NAU_Short': signal_i < -20 and confidence > cfg['confidence_threshold'],
+            # Fractals, order blocks and FVGs are only confirmed for earlier bars
+            'Fractal_High': np.nan, 'Fractal_Low': np.nan,
+            'Bull_OB': np.nan, 'Bear_OB': np.nan,
+            'Bull_FVG_Top': np.nan, 'Bull_FVG_Bot': np.nan,
+            'Bear_FVG_Top': np.nan, 'Bear_FVG_Bot': np.nan,
+            'BOS': float(bos_i), 'CHoCH': float(choch_i),
+        }
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -0,0 +1,37 @@
+import numpy as np
+
+from nau_quantum_engine import EntropyAnalyzer
+
+
+def dfa_reference(x, max_lag=20):
+    """Per-segment polyfit DFA, the loop rolling_dfa_hurst vectorises."""
+    points = []
+    for seg in range(4, min(max_lag, len(x) // 2) + 1):
+        t = np.arange(seg)
+        f2 = np.mean([np.mean((part - np.polyval(np.polyfit(t, part, 1), t)) ** 2)
+                      for part in (x[i*seg:(i+1)*seg] for i in range(len(x) // seg))])
+        if f2 > 0:
+            points.append((np.log(seg), 0.5 * np.log(f2)))
+    if len(points) < 2:
+        return 0.5
+    points = np.array(points)
+    return float(np.clip(np.polyfit(points[:, 0], points[:, 1], 1)[0], 0.0, 1.0))
+
+
+def test_rolling_dfa_hurst_long_trending_series():
+    # A strong drift on a large offset: global prefix sums cancel here
+    rng = np.random.default_rng(0)
+    n, window = 100_000, 40
+    x = 5e4 + np.arange(n) + 1e-3 * rng.standard_normal(n)
+    got = EntropyAnalyzer.rolling_dfa_hurst(x, window)
+    assert len(got) == n - window + 1
+    for start in range(0, n - window + 1, 4999):
+        assert abs(got[start] - dfa_reference(x[start:start + window])) < 1e-6
+
+
+def test_rolling_dfa_hurst_random_walk_matches_reference():
+    rng = np.random.default_rng(1)
+    x = 3e4 + np.cumsum(rng.standard_normal(600))
+    got = EntropyAnalyzer.rolling_dfa_hurst(x, 40)
+    ref = [dfa_reference(x[j:j + 40]) for j in range(len(x) - 39)]
+    np.testing.assert_allclose(got, ref, atol=1e-9)